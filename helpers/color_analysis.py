@@ -1,72 +1,139 @@
-from colorsys import rgb_to_hls
+import numpy as np
+from helpers.lru_cache import LRUCache, copy_result, hex_cache_key
+
+_analysis_cache = LRUCache("analyze_color")
+
+TEMPERATURES = np.array(["Warm", "Cool", "Neutral"])
+VALUES = np.array(["Very Light", "Light", "Medium", "Dark", "Very Dark"])
+CHROMAS = np.array(["Bright", "Soft", "Muted"])
+
+# Notes in the order they are joined into the description
+NOTES = [
+    "Works well for soft summer & light spring palettes.",
+    "Can overpower soft palettes; suits deep winter/autumn.",
+    "High chroma — good for bold contrast styling.",
+    "Soft muted tone — ideal for romantic/neutral styling.",
+    "Complements gold jewelry and warm-toned outfits.",
+    "Matches silver/platinum accessories.",
+]
+
+# Every combination of notes, indexed by a bitmask of which ones apply
+DESCRIPTIONS = np.array([
+    "; ".join(note for bit, note in enumerate(NOTES) if mask & (1 << bit))
+    for mask in range(1 << len(NOTES))
+], dtype=object)
 
 def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
-def analyze_color(hex_code):
-    r, g, b = hex_to_rgb(hex_code)
+def rgb_to_hls_array(rgb):
+    """colorsys.rgb_to_hls over an (N, 3) 0–255 array, with identical float results."""
+    rgb = np.asarray(rgb, dtype=np.float64).reshape(-1, 3) / 255
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+
+    maxc = rgb.max(axis=1)
+    minc = rgb.min(axis=1)
+    sumc = maxc + minc
+    rangec = maxc - minc
+    l = sumc / 2.0
+
+    gray = minc == maxc
+    # Placeholder denominators for grays; their h and s are overwritten below
+    safe_range = np.where(gray, 1.0, rangec)
+    s = np.where(l <= 0.5,
+                 rangec / np.where(gray, 1.0, sumc),
+                 rangec / np.where(gray, 1.0, 2.0 - maxc - minc))
+
+    rc = (maxc - r) / safe_range
+    gc = (maxc - g) / safe_range
+    bc = (maxc - b) / safe_range
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = (h / 6.0) % 1.0
+
+    return np.where(gray, 0.0, h), l, np.where(gray, 0.0, s)
+
+def hls_to_rgb_array(h, l, s):
+    """colorsys.hls_to_rgb over arrays of 0–1 h, l, s, scaled and rounded to 0–255 uint8."""
+    h, l, s = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (h, l, s)))
+    m2 = np.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+    m1 = 2.0 * l - m2
 
-    # Normalize 0–1
-    rn, gn, bn = r/255, g/255, b/255
+    def channel(hue):
+        hue = hue % 1.0
+        return np.select(
+            [hue < 1 / 6, hue < 0.5, hue < 2 / 3],
+            [m1 + (m2 - m1) * hue * 6.0, m2, m1 + (m2 - m1) * (2 / 3 - hue) * 6.0],
+            default=m1)
 
-    # Convert to HLS (Hue, Lightness, Saturation)
-    h, l, s = rgb_to_hls(rn, gn, bn)
+    rgb = np.stack((channel(h + 1 / 3), channel(h), channel(h - 1 / 3)), axis=-1)
+    rgb = np.where((s == 0.0)[..., None], l[..., None], rgb)
+    return np.clip(np.rint(rgb * 255), 0, 255).astype(np.uint8)
+
+def analyze_colors(rgb):
+    """Columnar analyze_color over an (N, 3) array of 0–255 RGB values.
+
+    Returns a dict of length-N arrays: temperature, value, chroma (labels),
+    hue_degree, lightness, saturation (unrounded floats) and description.
+    """
+    h, l, s = rgb_to_hls_array(rgb)
 
     # Convert hue 0–1 → degrees 0–360
     hue_deg = h * 360
 
     # ---------- TEMPERATURE ----------
-    if hue_deg < 60 or hue_deg > 300:
-        temperature = "Warm"
-    elif 60 <= hue_deg <= 180:
-        temperature = "Cool"
-    else:
-        temperature = "Neutral"
+    temperature = np.select(
+        [(hue_deg < 60) | (hue_deg > 300), (hue_deg >= 60) & (hue_deg <= 180)], [0, 1], default=2)
 
     # ---------- VALUE (LIGHTNESS) ----------
-    if l > 0.75:
-        value = "Very Light"
-    elif l > 0.55:
-        value = "Light"
-    elif l > 0.35:
-        value = "Medium"
-    elif l > 0.20:
-        value = "Dark"
-    else:
-        value = "Very Dark"
+    value = np.select([l > 0.75, l > 0.55, l > 0.35, l > 0.20], [0, 1, 2, 3], default=4)
 
     # ---------- CHROMA (SATURATION) ----------
-    if s > 0.65:
-        chroma = "Bright"
-    elif s > 0.40:
-        chroma = "Soft"
-    else:
-        chroma = "Muted"
+    chroma = np.select([s > 0.65, s > 0.40], [0, 1], default=2)
 
     # ---------- EXTRA NOTES ----------
-    notes = []
-
-    if value in ["Very Light", "Light"]:
-        notes.append("Works well for soft summer & light spring palettes.")
-    if value in ["Dark", "Very Dark"]:
-        notes.append("Can overpower soft palettes; suits deep winter/autumn.")
-    if chroma == "Bright":
-        notes.append("High chroma — good for bold contrast styling.")
-    if chroma == "Muted":
-        notes.append("Soft muted tone — ideal for romantic/neutral styling.")
-    if temperature == "Warm":
-        notes.append("Complements gold jewelry and warm-toned outfits.")
-    if temperature == "Cool":
-        notes.append("Matches silver/platinum accessories.")
+    notes = ((value <= 1).astype(np.int64)
+             | (value >= 3) << 1
+             | (chroma == 0) << 2
+             | (chroma == 2) << 3
+             | (temperature == 0) << 4
+             | (temperature == 1) << 5)
+
+    return {
+        "temperature": TEMPERATURES[temperature],
+        "value": VALUES[value],
+        "chroma": CHROMAS[chroma],
+        "hue_degree": hue_deg,
+        "lightness": l,
+        "saturation": s,
+        "description": DESCRIPTIONS[notes],
+    }
 
+def analysis_record(columns, i, hex_code):
+    """Row i of analyze_colors() output in the per-color analyze_color() shape."""
     return {
         "hex": hex_code,
-        "temperature": temperature,
-        "value": value,
-        "chroma": chroma,
-        "hue_degree": round(hue_deg, 2),
-        "lightness": round(l, 2),
-        "saturation": round(s, 2),
-        "description": "; ".join(notes)
+        "temperature": str(columns["temperature"][i]),
+        "value": str(columns["value"][i]),
+        "chroma": str(columns["chroma"][i]),
+        "hue_degree": round(float(columns["hue_degree"][i]), 2),
+        "lightness": round(float(columns["lightness"][i]), 2),
+        "saturation": round(float(columns["saturation"][i]), 2),
+        "description": columns["description"][i]
     }
+
+def analyze_color(hex_code):
+    key = hex_cache_key(hex_code)
+    if key is None:
+        return _analyze_color(hex_code)
+
+    cached = _analysis_cache.get(key)
+    if cached is None:
+        cached = _analyze_color(key)
+        _analysis_cache.put(key, cached)
+    result = copy_result(cached)
+    result["hex"] = hex_code
+    return result
+
+def _analyze_color(hex_code):
+    return analysis_record(analyze_colors([hex_to_rgb(hex_code)]), 0, hex_code)
@@ -1,33 +1,100 @@
 # helpers/colora.py
 
+import re
 from math import sqrt
-from helpers.color_db import COLOR_DB
+from helpers.lru_cache import LRUCache, copy_result, hex_cache_key
+from helpers.palette import DEFAULT_PALETTE, get_palette, palette_generation
+
+HEX_PATTERN = re.compile(r'^#?[0-9a-fA-F]{6}$')
+
+_nearest_cache = LRUCache("nearest_color")
 
 def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
+def rgb_to_hex(rgb):
+    return "#%02X%02X%02X" % tuple(int(c) for c in rgb)
+
 def color_distance(c1, c2):
     return sqrt(sum((a - b) ** 2 for a, b in zip(c1, c2)))
 
-def nearest_color(input_hex):
-    input_rgb = hex_to_rgb(input_hex)
+def nearest_color(input_hex, metric="rgb", k=1, palette=DEFAULT_PALETTE):
+    """Closest palette shade to input_hex.
+
+    With k > 1 the result also lists the k nearest shades under "matches",
+    sorted by distance; the top-level fields still describe the best one.
+    Results are memoized per normalized hex, metric, k and palette (and its
+    registration, so re-registering a palette name never serves stale matches).
+    """
+    key = hex_cache_key(input_hex)
+    if key is None:
+        return _nearest_color(input_hex, metric, k, palette)
+
+    cache_key = (key, metric, k, palette, palette_generation(palette))
+    cached = _nearest_cache.get(cache_key)
+    if cached is None:
+        cached = _nearest_color(key, metric, k, palette)
+        _nearest_cache.put(cache_key, cached)
+    result = copy_result(cached)
+    result["input_hex"] = input_hex
+    return result
+
+def _nearest_color(input_hex, metric, k, palette_name):
+    palette = get_palette(palette_name)
+
+    if k == 1:
+        index, min_dist = palette.nearest(hex_to_rgb(input_hex), metric=metric)
+        return {
+            "input_hex": input_hex,
+            "closest_name": palette.name(index),
+            "closest_hex": palette.hex(index),
+            "distance": round(min_dist, 4)
+        }
+
+    indices, distances = palette.nearest_k(hex_to_rgb(input_hex), k, metric=metric)
+    matches = [
+        {
+            "closest_name": palette.name(index),
+            "closest_hex": palette.hex(index),
+            "distance": round(dist, 4)
+        }
+        for index, dist in zip(indices.tolist(), distances.tolist())
+    ]
+    return {"input_hex": input_hex, **matches[0], "matches": matches}
+
+
+def parse_hex(hex_color):
+    """Validate a '#RRGGBB' / 'RRGGBB' string and return its RGB tuple."""
+    if not isinstance(hex_color, str) or not HEX_PATTERN.match(hex_color.strip()):
+        raise ValueError(f"Invalid hex color: {hex_color!r}")
+    return hex_to_rgb(hex_color.strip())
+
+def nearest_colors(hex_codes, metric="rgb", palette=DEFAULT_PALETTE):
+    """Batch nearest_color(): one vectorized palette query for all valid inputs.
 
-    min_dist = float('inf')
-    closest_name = None
-    closest_hex = None
+    Results keep input order; invalid entries get {"input_hex", "error"} instead.
+    """
+    palette = get_palette(palette)
+    results = [None] * len(hex_codes)
+    positions = []
+    rgb = []
 
-    for name, hex_color in COLOR_DB.items():
-        dist = color_distance(input_rgb, hex_to_rgb(hex_color))
+    for i, hex_code in enumerate(hex_codes):
+        try:
+            rgb.append(parse_hex(hex_code))
+            positions.append(i)
+        except ValueError as e:
+            results[i] = {"input_hex": hex_code, "error": str(e)}
 
-        if dist < min_dist:
-            min_dist = dist
-            closest_name = name
-            closest_hex = hex_color
+    if positions:
+        indices, distances = palette.nearest_many(rgb, metric=metric)
+        for i, index, dist in zip(positions, indices.tolist(), distances.tolist()):
+            results[i] = {
+                "input_hex": hex_codes[i],
+                "closest_name": palette.name(index),
+                "closest_hex": palette.hex(index),
+                "distance": round(dist, 4)
+            }
 
-    return {
-        "input_hex": input_hex,
-        "closest_name": closest_name,
-        "closest_hex": closest_hex,
-        "distance": round(min_dist, 4)
-    }
+    return results
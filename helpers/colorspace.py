@@ -0,0 +1,102 @@
+# helpers/colorspace.py
+
+import numpy as np
+
+# D65 reference white
+WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+
+SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+
+XYZ_TO_SRGB = np.linalg.inv(SRGB_TO_XYZ)
+
+_EPSILON = (6 / 29) ** 3
+_KAPPA = 3 * (6 / 29) ** 2
+_POW25_7 = 25.0 ** 7
+
+
+def srgb_to_linear(rgb):
+    """Undo the sRGB transfer curve; input is 0–255, output linear 0–1."""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+
+def srgb_to_lab(rgb):
+    """Convert (..., 3) sRGB 0–255 values to CIELAB (D65)."""
+    xyz = srgb_to_linear(rgb) @ SRGB_TO_XYZ.T / WHITE_D65
+    f = np.where(xyz > _EPSILON, np.cbrt(xyz), xyz / _KAPPA + 4 / 29)
+    fx, fy, fz = f[..., 0], f[..., 1], f[..., 2]
+    return np.stack((116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)), axis=-1)
+
+
+def lab_to_srgb(lab):
+    """Convert (..., 3) CIELAB (D65) back to sRGB 0–255 uint8, clipping out-of-gamut values."""
+    lab = np.asarray(lab, dtype=np.float64)
+    fy = (lab[..., 0] + 16) / 116
+    f = np.stack((fy + lab[..., 1] / 500, fy, fy - lab[..., 2] / 200), axis=-1)
+    xyz = np.where(f > 6 / 29, f ** 3, _KAPPA * (f - 4 / 29)) * WHITE_D65
+    linear = np.clip(xyz @ XYZ_TO_SRGB.T, 0, 1)
+    srgb = np.where(linear <= 0.0031308, 12.92 * linear, 1.055 * linear ** (1 / 2.4) - 0.055)
+    return np.clip(np.rint(srgb * 255), 0, 255).astype(np.uint8)
+
+
+def delta_e76(lab1, lab2):
+    """CIE76 color difference: Euclidean distance in Lab."""
+    diff = np.asarray(lab1, dtype=np.float64) - np.asarray(lab2, dtype=np.float64)
+    return np.sqrt(np.sum(diff * diff, axis=-1))
+
+
+def delta_e2000(lab1, lab2):
+    """CIEDE2000 color difference, broadcasting over leading dimensions."""
+    lab1 = np.asarray(lab1, dtype=np.float64)
+    lab2 = np.asarray(lab2, dtype=np.float64)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    c_bar7 = c_bar ** 7
+    g = 0.5 * (1 - np.sqrt(c_bar7 / (c_bar7 + _POW25_7)))
+    a1p = (1 + g) * a1
+    a2p = (1 + g) * a2
+    c1p = np.hypot(a1p, b1)
+    c2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    chroma_zero = (c1p * c2p) == 0
+    dlp = L2 - L1
+    dcp = c2p - c1p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp = np.where(chroma_zero, 0.0, dhp)
+    big_hp = 2 * np.sqrt(c1p * c2p) * np.sin(np.radians(dhp / 2))
+
+    l_bar = (L1 + L2) / 2
+    cp_bar = (c1p + c2p) / 2
+    h_sum = h1p + h2p
+    h_bar = np.where(
+        np.abs(h1p - h2p) <= 180, h_sum / 2,
+        np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2),
+    )
+    h_bar = np.where(chroma_zero, h_sum, h_bar)
+
+    t = (1 - 0.17 * np.cos(np.radians(h_bar - 30))
+         + 0.24 * np.cos(np.radians(2 * h_bar))
+         + 0.32 * np.cos(np.radians(3 * h_bar + 6))
+         - 0.20 * np.cos(np.radians(4 * h_bar - 63)))
+    d_theta = 30 * np.exp(-(((h_bar - 275) / 25) ** 2))
+    cp_bar7 = cp_bar ** 7
+    r_c = 2 * np.sqrt(cp_bar7 / (cp_bar7 + _POW25_7))
+    l_term = (l_bar - 50) ** 2
+    s_l = 1 + 0.015 * l_term / np.sqrt(20 + l_term)
+    s_c = 1 + 0.045 * cp_bar
+    s_h = 1 + 0.015 * cp_bar * t
+    r_t = -np.sin(np.radians(2 * d_theta)) * r_c
+
+    dl = dlp / s_l
+    dc = dcp / s_c
+    dh = big_hp / s_h
+    return np.sqrt(dl * dl + dc * dc + dh * dh + r_t * dc * dh)
@@ -0,0 +1,74 @@
+# helpers/contrast.py
+#
+# Contrast between a person's skin, eyes and hair, computed for many profiles
+# at once. Input is an (M, 3, 3) array of sRGB colors ordered skin, eyes, hair.
+
+import numpy as np
+from helpers.colorspace import delta_e2000, srgb_to_lab, srgb_to_linear
+
+TRAITS = ("skin", "eyes", "hair")
+
+# (name, first trait, second trait) for every compared pair
+PAIRS = (("skin_hair", 0, 2), ("skin_eyes", 0, 1), ("eyes_hair", 1, 2))
+
+# WCAG 2.x relative luminance weights for linear sRGB
+LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+
+LEVELS = np.array(["Low", "Medium", "High"])
+
+# Upper bounds of the largest ΔL* for the Low and Medium levels
+LEVEL_BOUNDS = np.array([25.0, 45.0])
+
+
+def relative_luminance(rgb):
+    """WCAG relative luminance (0–1) of (..., 3) sRGB 0–255 values."""
+    return srgb_to_linear(rgb) @ LUMINANCE_WEIGHTS
+
+
+def contrast_ratio(y1, y2):
+    """WCAG contrast ratio (1–21) between two relative luminances."""
+    high = np.maximum(y1, y2)
+    low = np.minimum(y1, y2)
+    return (high + 0.05) / (low + 0.05)
+
+
+def profile_contrasts(rgb):
+    """Columnar contrast metrics for (M, 3, 3) skin/eyes/hair colors.
+
+    Per pair: absolute ΔL*, ΔE2000, absolute chroma difference ΔC* and WCAG
+    luminance ratio. Overall: largest ΔL* and ratio, and a Low/Medium/High level.
+    """
+    rgb = np.asarray(rgb, dtype=np.float64).reshape(-1, 3, 3)
+    lab = srgb_to_lab(rgb)
+    chroma = np.hypot(lab[..., 1], lab[..., 2])
+    luminance = relative_luminance(rgb)
+
+    pairs = {}
+    for name, a, b in PAIRS:
+        pairs[name] = {
+            "delta_l": np.abs(lab[:, a, 0] - lab[:, b, 0]),
+            "delta_e": delta_e2000(lab[:, a], lab[:, b]),
+            "delta_chroma": np.abs(chroma[:, a] - chroma[:, b]),
+            "luminance_ratio": contrast_ratio(luminance[:, a], luminance[:, b]),
+        }
+
+    lightness_contrast = np.max([p["delta_l"] for p in pairs.values()], axis=0)
+    return {
+        "pairs": pairs,
+        "lightness_contrast": lightness_contrast,
+        "luminance_ratio": np.max([p["luminance_ratio"] for p in pairs.values()], axis=0),
+        "level": LEVELS[np.searchsorted(LEVEL_BOUNDS, lightness_contrast)],
+    }
+
+
+def contrast_record(columns, i):
+    """Row i of profile_contrasts() output as a JSON-ready dict."""
+    return {
+        "level": str(columns["level"][i]),
+        "lightness_contrast": round(float(columns["lightness_contrast"][i]), 2),
+        "luminance_ratio": round(float(columns["luminance_ratio"][i]), 2),
+        "pairs": {
+            name: {metric: round(float(values[i]), 2) for metric, values in metrics.items()}
+            for name, metrics in columns["pairs"].items()
+        }
+    }
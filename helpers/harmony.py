@@ -0,0 +1,39 @@
+# helpers/harmony.py
+#
+# Color-harmony candidates (hue rotations and lightness ramps) generated as one
+# HLS array, so they can be snapped to a palette in a single nearest_many().
+
+import numpy as np
+from helpers.color_analysis import hls_to_rgb_array, rgb_to_hls_array
+
+# Hue rotations in degrees for each harmony
+HUE_HARMONIES = {
+    "complementary": (180,),
+    "analogous": (-30, 30),
+    "triadic": (120, 240),
+    "split_complementary": (150, 210),
+}
+
+# Fractions of the way to white (tints) or black (shades)
+RAMP_STEPS = (0.2, 0.4, 0.6, 0.8)
+
+HARMONIES = tuple(HUE_HARMONIES) + ("tints", "shades")
+
+
+def harmony_candidates(rgb):
+    """Harmony colors for one 0–255 RGB triple.
+
+    Returns (groups, rgb): the harmony name of each candidate and an (N, 3)
+    uint8 array of the generated colors, grouped in HARMONIES order.
+    """
+    h, l, s = (x[0] for x in rgb_to_hls_array(rgb))
+
+    rotations = np.array([d for g in HUE_HARMONIES.values() for d in g], dtype=np.float64)
+    steps = np.array(RAMP_STEPS)
+
+    hue = np.concatenate((h + rotations / 360, np.full(2 * len(steps), h)))
+    lightness = np.concatenate((np.full(len(rotations), l), l + (1 - l) * steps, l * (1 - steps)))
+    groups = ([name for name, g in HUE_HARMONIES.items() for _ in g]
+              + ["tints"] * len(steps) + ["shades"] * len(steps))
+
+    return groups, hls_to_rgb_array(hue, lightness, s)
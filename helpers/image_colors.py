@@ -0,0 +1,224 @@
+# helpers/image_colors.py
+#
+# Decode uploaded photos into small RGB arrays and pull out their dominant
+# colors. Pillow is imported on first use so it stays out of app startup.
+
+import io
+
+import numpy as np
+
+from helpers.colorspace import delta_e76, lab_to_srgb, srgb_to_lab
+
+# Longest side, in pixels, images are reduced to before any color math
+MAX_SIDE = 256
+
+# Pixels clustered per image; the rest only affect the result through sampling
+SAMPLE_SIZE = 20000
+
+KMEANS_ITERATIONS = 12
+
+# Bits kept per channel by the histogram quantizer (5 -> 32,768 bins)
+HISTOGRAM_BITS = 5
+
+# Proportion reports bucket pixels rather than clustering, so they can afford
+# more of them
+REPORT_MAX_SIDE = 1024
+
+# Region sampling keeps more detail so small regions (eyes) still cover pixels
+REGION_MAX_SIDE = 1024
+
+# Region outlier rejection: keep pixels between these L* percentiles
+# (drops specular highlights and deep shadows), then those within
+# REGION_MAD_SCALE median absolute deviations (ΔE76) of the median color
+REGION_LIGHTNESS_PERCENTILES = (10, 90)
+REGION_MAD_SCALE = 2.5
+
+
+class ImageDecodeError(ValueError):
+    pass
+
+
+def load_image_rgb(data, max_side=MAX_SIDE):
+    """Decode image bytes into an (H, W, 3) uint8 array no larger than max_side.
+
+    Returns (pixels, (original_width, original_height)). JPEGs are decoded at
+    reduced scale directly (draft mode), so a 12 MP photo never gets
+    inflated at full size.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        original_size = image.size
+        # EXIF orientations 5–8 rotate by 90°, swapping the displayed width/height
+        if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            original_size = original_size[::-1]
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.BILINEAR, reducing_gap=2.0)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageDecodeError(f"Could not decode image: {e}")
+
+    return np.asarray(image, dtype=np.uint8), original_size
+
+
+def sample_pixels(pixels, size=SAMPLE_SIZE, seed=0):
+    """Up to size pixels from an (..., 3) array, as an (N, 3) float array."""
+    flat = pixels.reshape(-1, 3)
+    if len(flat) > size:
+        rng = np.random.default_rng(seed)
+        flat = flat[rng.choice(len(flat), size, replace=False)]
+    return flat.astype(np.float64)
+
+
+def kmeans(points, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Lloyd's k-means with k-means++ seeding. Returns (centers, labels)."""
+    rng = np.random.default_rng(seed)
+    n = len(points)
+
+    centers = [points[rng.integers(n)]]
+    closest_sq = np.sum((points - centers[0]) ** 2, axis=1)
+    while len(centers) < k:
+        total = closest_sq.sum()
+        if total == 0:
+            break
+        centers.append(points[rng.choice(n, p=closest_sq / total)])
+        closest_sq = np.minimum(closest_sq, np.sum((points - centers[-1]) ** 2, axis=1))
+    centers = np.array(centers)
+
+    point_sq = np.einsum('ij,ij->i', points, points)
+    labels = None
+    for _ in range(iterations):
+        dist_sq = point_sq[:, None] - 2 * points @ centers.T + np.einsum('ij,ij->i', centers, centers)
+        new_labels = np.argmin(dist_sq, axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.stack([np.bincount(labels, weights=points[:, c], minlength=len(centers))
+                         for c in range(3)], axis=1)
+        filled = counts > 0
+        centers[filled] = sums[filled] / counts[filled, None]
+
+    return centers, labels
+
+
+def dominant_colors(pixels, k=5):
+    """The k dominant colors of an image array.
+
+    Returns (rgb, fractions): an (m, 3) uint8 array, m <= k, ordered by the
+    share of sampled pixels each color covers.
+    """
+    points = sample_pixels(pixels)
+    centers, labels = kmeans(points, k)
+    counts = np.bincount(labels, minlength=len(centers))
+
+    order = np.argsort(-counts, kind="stable")
+    order = order[counts[order] > 0]
+    rgb = np.clip(np.rint(centers[order]), 0, 255).astype(np.uint8)
+    return rgb, counts[order] / counts.sum()
+
+
+def color_histogram(pixels, bits=HISTOGRAM_BITS):
+    """Single-pass histogram quantizer.
+
+    Buckets every pixel by the top `bits` of each channel with one bincount
+    and returns the occupied buckets as a weighted color set: (colors, counts),
+    where each color is the mean of the pixels that fell in its bucket.
+    Memory is O(2 ** (3 * bits)) regardless of image size.
+    """
+    flat = pixels.reshape(-1, 3)
+    shift = 8 - bits
+    q = (flat >> shift).astype(np.int32)
+    bins = (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+
+    size = 1 << (3 * bits)
+    counts = np.bincount(bins, minlength=size)
+    occupied = np.flatnonzero(counts)
+    sums = np.stack([np.bincount(bins, weights=flat[:, c], minlength=size)[occupied]
+                     for c in range(3)], axis=1)
+    return sums / counts[occupied, None], counts[occupied]
+
+
+def palette_proportions(pixels, palette, metric="rgb", bits=HISTOGRAM_BITS):
+    """Share of the image covered by each palette entry.
+
+    The histogram's bucket colors are matched in one nearest_many() call and
+    their pixel counts summed per entry. Returns (indices, fractions) for the
+    entries that cover any pixels, largest share first.
+    """
+    colors, counts = color_histogram(pixels, bits)
+    indices, _ = palette.nearest_many(np.rint(colors), metric=metric)
+    totals = np.bincount(indices, weights=counts, minlength=len(palette))
+
+    used = np.flatnonzero(totals)
+    used = used[np.argsort(-totals[used], kind="stable")]
+    return used, totals[used] / counts.sum()
+
+
+def region_mask(shape, region, scale):
+    """Boolean (H, W) mask for a {"rect": [x, y, w, h]} or {"polygon": [[x, y], ...]} region.
+
+    Coordinates are in original-image pixels; scale maps them onto the array.
+    """
+    height, width = shape[:2]
+    mask = np.zeros((height, width), dtype=bool)
+
+    if "rect" in region:
+        try:
+            x, y, w, h = (float(v) * scale for v in region["rect"])
+        except (TypeError, ValueError):
+            raise ValueError("rect must be [x, y, width, height]")
+        x0, y0 = max(int(np.floor(x)), 0), max(int(np.floor(y)), 0)
+        x1, y1 = min(int(np.ceil(x + w)), width), min(int(np.ceil(y + h)), height)
+        mask[y0:y1, x0:x1] = True
+        return mask
+
+    if "polygon" in region:
+        try:
+            vertices = np.asarray(region["polygon"], dtype=np.float64) * scale
+        except (TypeError, ValueError):
+            vertices = None
+        if vertices is None or vertices.ndim != 2 or vertices.shape[1] != 2 or len(vertices) < 3:
+            raise ValueError("polygon must be a list of at least three [x, y] points")
+
+        # Even-odd rule over pixel centers inside the polygon's bounding box
+        x0, y0 = np.clip(np.floor(vertices.min(axis=0)).astype(int), 0, [width, height])
+        x1, y1 = np.clip(np.ceil(vertices.max(axis=0)).astype(int) + 1, 0, [width, height])
+        py, px = np.mgrid[y0:y1, x0:x1] + 0.5
+        inside = np.zeros(px.shape, dtype=bool)
+        xa, ya = vertices[:, 0], vertices[:, 1]
+        xb, yb = np.roll(xa, -1), np.roll(ya, -1)
+        for ax, ay, bx, by in zip(xa, ya, xb, yb):
+            if ay == by:
+                continue
+            crosses = (ay > py) != (by > py)
+            x_at = ax + (py - ay) * (bx - ax) / (by - ay)
+            inside ^= crosses & (px < x_at)
+        mask[y0:y1, x0:x1] = inside
+        return mask
+
+    raise ValueError('region needs a "rect" or "polygon"')
+
+
+def representative_color(pixels):
+    """One robust color for an (N, 3) set of region pixels.
+
+    Works in Lab: trims the lightness tails, drops pixels far from the median
+    color, and returns (rgb, inlier_count) for the median of what is left.
+    """
+    lab = srgb_to_lab(pixels)
+
+    low, high = np.percentile(lab[:, 0], REGION_LIGHTNESS_PERCENTILES)
+    kept = lab[(lab[:, 0] >= low) & (lab[:, 0] <= high)]
+    if len(kept) == 0:
+        kept = lab
+
+    distance = delta_e76(kept, np.median(kept, axis=0))
+    mad = np.median(np.abs(distance - np.median(distance)))
+    inliers = kept[distance <= np.median(distance) + REGION_MAD_SCALE * max(mad, 1e-6)]
+
+    return lab_to_srgb(np.median(inliers, axis=0)), len(inliers)
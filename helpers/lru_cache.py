@@ -0,0 +1,92 @@
+# helpers/lru_cache.py
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+DEFAULT_CAPACITY = int(os.environ.get("COLOR_CACHE_SIZE", "4096"))
+
+_HEX_KEY = re.compile(r'^#?([0-9a-fA-F]{6})$')
+
+# name -> LRUCache, for the debug endpoint
+CACHES = {}
+
+
+def hex_cache_key(hex_code):
+    """Normalize a hex string to '#RRGGBB', or None if it isn't a valid hex color."""
+    if not isinstance(hex_code, str):
+        return None
+    m = _HEX_KEY.match(hex_code.strip())
+    return f"#{m.group(1).upper()}" if m else None
+
+
+def copy_result(result):
+    """Copy a cached result so callers can't mutate the cached object."""
+    copied = dict(result)
+    for key, value in copied.items():
+        if isinstance(value, list):
+            copied[key] = [dict(v) if isinstance(v, dict) else v for v in value]
+        elif isinstance(value, dict):
+            copied[key] = copy_result(value)
+    return copied
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with hit/miss/eviction counters."""
+
+    def __init__(self, name, capacity=DEFAULT_CAPACITY):
+        self.name = name
+        self.capacity = max(0, int(capacity))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        CACHES[name] = self
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.capacity == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def resize(self, capacity):
+        with self._lock:
+            self.capacity = max(0, int(capacity))
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def _evict(self):
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "capacity": self.capacity,
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
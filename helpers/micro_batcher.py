@@ -0,0 +1,92 @@
+# helpers/micro_batcher.py
+#
+# Collects items submitted within a short window (or until a batch is full)
+# and hands them to one batch coroutine, fanning its per-item results back
+# out to the waiting callers.
+
+import asyncio
+
+
+class MicroBatcher:
+    """Group concurrent submit() calls into batches for run_batch.
+
+    run_batch(items) must return one result per item, in order; an item whose
+    result is an exception raises it in that item's caller only.
+    """
+
+    def __init__(self, run_batch, window, max_size):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_size = max(1, int(max_size))
+        self._pending = []
+        self._timer = None
+        # Strong references to running batches; the loop only keeps weak ones
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self, timeout=None):
+        """Run what is pending now and wait up to timeout seconds for running
+        batches; callers of any batch still running after that get
+        CancelledError. Call on shutdown, before the batch's resources close."""
+        self._flush()
+        if not self._tasks:
+            return
+        _, running = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.wait(running)
+
+    async def _run(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        self.largest = max(self.largest, len(batch))
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "window_ms": round(self.window * 1000, 3),
+            "max_size": self.max_size,
+            "batches": self.batches,
+            "items": self.items,
+            "largest": self.largest,
+            "mean_size": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
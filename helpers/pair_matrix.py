@@ -0,0 +1,75 @@
+# helpers/pair_matrix.py
+#
+# Precomputed N x N ΔE2000 matrix over a palette, quantized to uint8 and
+# memory-mapped from LUT_DIR like the RGB lookup table. It only narrows the
+# candidates for ΔE thresholds; reported values are recomputed exactly.
+# Palettes above PAIR_MATRIX_MAX_ENTRIES get no matrix (N² bytes on disk).
+
+import hashlib
+import os
+
+import numpy as np
+from helpers.colorspace import delta_e2000
+from helpers.rgb_lut import LUT_DIR, remove_stale_tables, write_table
+
+# Bump when the layout or the quantization changes
+PAIR_FORMAT_VERSION = 2
+
+# Largest palette that gets a matrix (4096 entries -> 16 MB)
+PAIR_MATRIX_MAX_ENTRIES = int(os.environ.get("COLOR_PAIR_MATRIX_MAX", "4096"))
+
+# ΔE2000 in steps of 0.5; the top value stands for "127.25 or more"
+DELTA_E_SCALE = 2.0
+_SATURATED = 255
+
+# Rows resolved per ΔE2000 block while building
+_ROWS_PER_BLOCK = 256
+
+
+def pair_hash(rgb):
+    """Stable hash of the palette points (and their order) the matrix covers."""
+    digest = hashlib.sha256()
+    digest.update(f"pair-matrix-v{PAIR_FORMAT_VERSION}".encode())
+    digest.update(np.ascontiguousarray(rgb, dtype=np.uint8).tobytes())
+    return digest.hexdigest()
+
+
+def pair_path(rgb, palette_name="default"):
+    return LUT_DIR / f"pair_matrix_{palette_name}_{pair_hash(rgb)[:16]}.bin"
+
+
+def quantize_delta_e(delta_e):
+    return np.clip(np.rint(np.asarray(delta_e) * DELTA_E_SCALE), 0, _SATURATED).astype(np.uint8)
+
+
+def delta_e_bounds(values):
+    """(low, high) bounds on the exact ΔE2000 behind quantized matrix values."""
+    values = np.asarray(values, dtype=np.float64)
+    low = np.maximum(values - 0.5, 0) / DELTA_E_SCALE
+    high = np.where(values == _SATURATED, np.inf, (values + 0.5) / DELTA_E_SCALE)
+    return low, high
+
+
+def build_pair_matrix(lab):
+    """Quantized (N, N) ΔE2000 matrix for palette lab values."""
+    n = len(lab)
+    matrix = np.empty((n, n), dtype=np.uint8)
+    for start in range(0, n, _ROWS_PER_BLOCK):
+        stop = min(start + _ROWS_PER_BLOCK, n)
+        matrix[start:stop] = quantize_delta_e(delta_e2000(lab[start:stop, None], lab[None]))
+    return matrix
+
+
+def load_pair_matrix(rgb, lab, palette_name="default"):
+    """Memory-map the matrix for this palette, building it first if missing or stale."""
+    n = len(rgb)
+    if n > PAIR_MATRIX_MAX_ENTRIES:
+        raise ValueError(f"Palette '{palette_name}' has {n} colors; pair matrices stop at "
+                         f"{PAIR_MATRIX_MAX_ENTRIES} (COLOR_PAIR_MATRIX_MAX)")
+    path = pair_path(rgb, palette_name)
+
+    if not path.exists() or path.stat().st_size != n * n:
+        write_table(path, build_pair_matrix(lab))
+        remove_stale_tables(path, f"pair_matrix_{palette_name}_{'?' * 16}.bin")
+
+    return np.memmap(path, dtype=np.uint8, mode="r", shape=(n, n))
@@ -0,0 +1,424 @@
+# helpers/palette.py
+
+import json
+import os
+import re
+import threading
+from math import sqrt
+from pathlib import Path
+
+import numpy as np
+from helpers.color_analysis import CHROMAS, analysis_record, analyze_colors
+from helpers.colorspace import srgb_to_lab, delta_e2000
+from helpers.contrast import contrast_ratio, relative_luminance
+from helpers.pair_matrix import PAIR_MATRIX_MAX_ENTRIES, build_pair_matrix, delta_e_bounds, load_pair_matrix
+from helpers.palette_compiler import compile_palette, load_color_db, load_palette_json
+from helpers.rgb_lut import load_lut, lut_is_built, pack_rgb
+from helpers.season_classifier import season_compatibility, season_index
+from helpers.spatial_index import build_index
+
+METRICS = ("rgb", "de76", "de2000")
+
+DEFAULT_PALETTE = "default"
+
+# Extra brand palettes: every <name>.json ({name: "#RRGGBB"}) in this directory
+PALETTE_DIR = Path(os.environ.get("COLOR_PALETTE_DIR", Path(__file__).resolve().parent.parent / "palettes"))
+
+_PALETTE_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+
+# Set COLOR_LUT=0 to skip the memory-mapped RGB lookup table
+USE_RGB_LUT = os.environ.get("COLOR_LUT", "1") != "0"
+
+# ΔE2000 queries score every entry (ΔE76 is no safe bound for pruning); batch
+# queries are scored in blocks of at most this many query x entry cells
+_DE2000_CHUNK_CELLS = 1 << 20
+
+
+def json_bytes(obj):
+    """Compact UTF-8 JSON, encoded the same way FastAPI's JSONResponse does."""
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class Palette:
+    """A color table parsed once into parallel arrays for vectorized matching."""
+
+    def __init__(self, names, rgb, lab=None, key=DEFAULT_PALETTE):
+        self.key = key
+        self.names = names
+        self.rgb = np.ascontiguousarray(rgb, dtype=np.int32)
+        self.lab = np.ascontiguousarray(srgb_to_lab(self.rgb) if lab is None else lab)
+        self._index = None
+        self._lab_index = None
+        self._lut = None
+        self._lut_started = False
+        self._lut_lock = threading.Lock()
+        self._analysis = None
+        self._hex_index = None
+        self._season_table = None
+        self._pairs = None
+        self._luminance = None
+        self.warmed = False
+
+    @classmethod
+    def from_color_map(cls, color_map, key=DEFAULT_PALETTE):
+        """Build from a {name: "#RRGGBB"} dict (validated and deduplicated)."""
+        names, rgb, _ = compile_palette(color_map)
+        return cls(names, rgb, key=key)
+
+    def __len__(self):
+        return len(self.names)
+
+    def name(self, index):
+        return self.names[index]
+
+    def hex(self, index):
+        r, g, b = self.rgb[index]
+        return f"#{r:02X}{g:02X}{b:02X}"
+
+    @property
+    def index(self):
+        """Spatial index over the RGB points, built on first query."""
+        if self._index is None:
+            self._index = build_index(self.rgb)
+        return self._index
+
+    @property
+    def lab_index(self):
+        """Spatial index over the Lab points (ΔE76 space), built on first query."""
+        if self._lab_index is None:
+            self._lab_index = build_index(self.lab)
+        return self._lab_index
+
+    @property
+    def lut(self):
+        """Memory-mapped RGB -> index table, or None if disabled, unavailable or
+        still being built.
+
+        A table already on disk is mapped right away. A missing one is built
+        in a background thread (several seconds) while queries use the spatial
+        index; scripts/build_artifacts.py prebuilds it.
+        """
+        if not self._lut_started and USE_RGB_LUT:
+            with self._lut_lock:
+                if not self._lut_started:
+                    self._lut_started = True
+                    if lut_is_built(self.rgb, self.key):
+                        self._load_lut()
+                    else:
+                        threading.Thread(target=self._load_lut, name=f"rgb-lut-{self.key}", daemon=True).start()
+        return self._lut
+
+    def _load_lut(self):
+        try:
+            self._lut = load_lut(self.rgb, self.key)
+        except OSError as e:
+            print(f"⚠️ RGB lookup table unavailable, using spatial index: {e}")
+
+    @property
+    def luminance(self):
+        """WCAG relative luminance of every entry."""
+        if self._luminance is None:
+            self._luminance = relative_luminance(self.rgb)
+        return self._luminance
+
+    @property
+    def pairs(self):
+        """Quantized (N, N) ΔE2000 matrix (see helpers.pair_matrix), or None for
+        palettes above PAIR_MATRIX_MAX_ENTRIES."""
+        if self._pairs is None and len(self) <= PAIR_MATRIX_MAX_ENTRIES:
+            try:
+                self._pairs = load_pair_matrix(self.rgb, self.lab, self.key)
+            except OSError as e:
+                print(f"⚠️ Pair matrix cache unavailable, keeping it in memory: {e}")
+                self._pairs = build_pair_matrix(self.lab)
+        return self._pairs
+
+    def partners(self, index, min_contrast=None, max_contrast=None, min_delta_e=None, max_delta_e=None,
+                 sort="contrast"):
+        """(indices, delta_e, contrast) of the entries whose pairing with entry
+        index passes every given threshold, by contrast (highest first) or
+        delta_e (smallest first).
+
+        Thresholds and reported values use the exact contrast ratio and
+        ΔE2000; the pair matrix only narrows the candidates for ΔE thresholds.
+        """
+        if sort not in ("contrast", "delta_e"):
+            raise ValueError(f"Unknown sort '{sort}', expected contrast or delta_e")
+        contrast = contrast_ratio(self.luminance[index], self.luminance)
+
+        mask = np.ones(len(self), dtype=bool)
+        mask[index] = False
+        if min_contrast is not None:
+            mask &= contrast >= min_contrast
+        if max_contrast is not None:
+            mask &= contrast <= max_contrast
+        if (min_delta_e is not None or max_delta_e is not None) and self.pairs is not None:
+            low, high = delta_e_bounds(self.pairs[index])
+            if min_delta_e is not None:
+                mask &= high >= min_delta_e
+            if max_delta_e is not None:
+                mask &= low <= max_delta_e
+
+        indices = np.flatnonzero(mask)
+        delta_e = delta_e2000(self.lab[index], self.lab[indices])
+        keep = np.ones(len(indices), dtype=bool)
+        if min_delta_e is not None:
+            keep &= delta_e >= min_delta_e
+        if max_delta_e is not None:
+            keep &= delta_e <= max_delta_e
+        indices, delta_e, contrast = indices[keep], delta_e[keep], contrast[indices[keep]]
+
+        order = np.argsort(-contrast if sort == "contrast" else delta_e, kind="stable")
+        return indices[order], delta_e[order], contrast[order]
+
+    def index_of_hex(self, hex_code):
+        """Position of an exact '#RRGGBB' palette entry (entries are unique)."""
+        if self._hex_index is None:
+            self._hex_index = {self.hex(i): i for i in range(len(self))}
+        return self._hex_index[hex_code.upper()]
+
+    @property
+    def analysis(self):
+        """analyze_colors() columns for every entry, computed once."""
+        return self._analysis_table()[0]
+
+    def analysis_record(self, index):
+        """analyze_color() result for entry index (a fresh dict)."""
+        return dict(self._analysis_table()[1][index])
+
+    def analysis_json(self, index):
+        """analyze_color() result for entry index, pre-serialized as JSON bytes."""
+        return self._analysis_table()[2][index]
+
+    def _analysis_table(self):
+        if self._analysis is None:
+            columns = analyze_colors(self.rgb)
+            records = [analysis_record(columns, i, self.hex(i)) for i in range(len(self))]
+            encoded = [json_bytes(record) for record in records]
+            self._analysis = (columns, records, encoded)
+        return self._analysis
+
+    @property
+    def season_scores(self):
+        """(N, 12) season compatibility of every entry, columns in SEASONS order."""
+        return self._season_tables()[0]
+
+    def season_shades(self, season, n=None, chroma=None):
+        """(indices, scores) of the entries that best suit season, best first.
+
+        chroma optionally keeps only entries with that analysis chroma label
+        ("Bright", "Soft", "Muted"). Both are slices of pre-sorted indexes.
+        """
+        column = season_index(season)
+        scores, by_season, by_chroma = self._season_tables()
+        if chroma is None:
+            order = by_season[column]
+        else:
+            label = str(chroma).title()
+            if label not in by_chroma:
+                raise ValueError(f"Unknown chroma '{chroma}', expected one of {', '.join(by_chroma)}")
+            order = by_chroma[label][column]
+        order = order[:n]
+        return order, scores[order, column]
+
+    def _season_tables(self):
+        if self._season_table is None:
+            scores = season_compatibility(self.lab)
+            # Stable sort so ties keep palette order
+            by_season = np.argsort(-scores, axis=0, kind="stable").T.copy()
+            chroma = self.analysis["chroma"]
+            by_chroma = {}
+            for label in CHROMAS:
+                members = np.flatnonzero(chroma == label)
+                order = np.argsort(-scores[members], axis=0, kind="stable").T
+                by_chroma[str(label)] = members[order]
+            self._season_table = (scores, by_season, by_chroma)
+        return self._season_table
+
+    def warm(self):
+        """Build the lookup table (or index), Lab index, analysis and season tables now instead of on first query."""
+        if self.lut is None:
+            self.index
+        self.lab_index
+        self._analysis_table()
+        self._season_tables()
+        self.warmed = True
+
+    def nearest(self, rgb, metric="rgb"):
+        """Return (index, distance) of the palette entry closest to one RGB triple.
+
+        metric is "rgb" (Euclidean sRGB), "de76" or "de2000" (perceptual ΔE).
+        """
+        if metric == "rgb":
+            lut = self.lut
+            if lut is not None:
+                r, g, b = (int(c) for c in rgb)
+                index = int(lut[(r << 16) | (g << 8) | b])
+                dr, dg, db = (int(c) for c in self.rgb[index])
+                return index, sqrt((r - dr) ** 2 + (g - dg) ** 2 + (b - db) ** 2)
+
+            distances, indices = self.index.query(rgb)
+            return int(indices[0, 0]), float(distances[0, 0])
+
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(METRICS)}")
+
+        lab = srgb_to_lab(np.asarray(rgb, dtype=np.float64))
+        if metric == "de76":
+            distances, indices = self.lab_index.query(lab)
+            return int(indices[0, 0]), float(distances[0, 0])
+
+        indices, distances = self._nearest_de2000(lab)
+        return int(indices[0]), float(distances[0])
+
+    def nearest_k(self, rgb, k, metric="rgb"):
+        """Return (indices, distances) of the k closest entries, nearest first."""
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        if metric == "rgb":
+            distances, indices = self.index.query(rgb, k=k)
+            return indices[0], distances[0]
+
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(METRICS)}")
+
+        lab = srgb_to_lab(np.asarray(rgb, dtype=np.float64))
+        if metric == "de76":
+            distances, indices = self.lab_index.query(lab, k=k)
+            return indices[0], distances[0]
+
+        return self._nearest_de2000(lab, k=k)
+
+    def nearest_many(self, rgb, metric="rgb"):
+        """Vectorized nearest(): (M, 3) RGB -> (indices, distances) arrays."""
+        rgb = np.asarray(rgb, dtype=np.int64).reshape(-1, 3)
+
+        if metric == "rgb":
+            lut = self.lut
+            if lut is not None:
+                indices = np.asarray(lut[pack_rgb(rgb)], dtype=np.intp)
+                diff = rgb - self.rgb[indices]
+                return indices, np.sqrt(np.einsum('ij,ij->i', diff, diff).astype(np.float64))
+
+            distances, indices = self.index.query(rgb)
+            return indices[:, 0], distances[:, 0]
+
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(METRICS)}")
+
+        lab = srgb_to_lab(rgb)
+        if metric == "de76":
+            distances, indices = self.lab_index.query(lab)
+            return indices[:, 0], distances[:, 0]
+
+        indices = np.empty(len(lab), dtype=np.intp)
+        distances = np.empty(len(lab))
+        step = max(1, _DE2000_CHUNK_CELLS // max(len(self), 1))
+        for lo in range(0, len(lab), step):
+            scores = delta_e2000(lab[lo:lo + step, None], self.lab[None])
+            # argmin keeps the lower index on ties, like _nearest_de2000
+            best = np.argmin(scores, axis=1)
+            indices[lo:lo + step] = best
+            distances[lo:lo + step] = np.take_along_axis(scores, best[:, None], axis=1)[:, 0]
+        return indices, distances
+
+    def _nearest_de2000(self, lab, k=1):
+        # Exact: one vectorized ΔE2000 scan over every entry
+        candidates = np.arange(len(self))
+        scores = delta_e2000(lab, self.lab)
+
+        if k == 1:
+            # argmin keeps the lower index on ties
+            best = int(np.argmin(scores))
+            return candidates[best:best + 1], scores[best:best + 1]
+        if k < len(candidates):
+            # Keep everything tied with the k-th score so the lower index wins
+            keep = np.flatnonzero(scores <= np.partition(scores, k - 1)[k - 1])
+            candidates, scores = candidates[keep], scores[keep]
+        order = np.lexsort((candidates, scores))[:k]
+        return candidates[order], scores[order]
+
+
+class UnknownPaletteError(LookupError):
+    pass
+
+
+# name -> callable returning (names, rgb, lab); nothing is loaded until asked for
+_palette_sources = {DEFAULT_PALETTE: load_color_db}
+_palettes = {}
+_palettes_lock = threading.Lock()
+
+# Bumped on every register_palette(name), so results cached per palette name
+# (e.g. nearest_color) stop matching once the name points at new colors
+_generations = {}
+
+
+def register_palette(name, source):
+    """Register a palette under name.
+
+    source is a {name: "#RRGGBB"} dict, a path to such a JSON file, or a
+    callable returning (names, rgb[, lab]). It is loaded on first get_palette().
+    """
+    if not _PALETTE_NAME.match(name):
+        raise ValueError(f"Invalid palette name '{name}'")
+    if isinstance(source, dict):
+        color_map = source
+        source = lambda: compile_palette(color_map)[:2]
+    elif isinstance(source, (str, Path)):
+        path = Path(source)
+        source = lambda: load_palette_json(path)
+    with _palettes_lock:
+        _palette_sources[name] = source
+        _palettes.pop(name, None)
+        _generations[name] = _generations.get(name, 0) + 1
+
+
+def palette_generation(name):
+    """Registration counter for name; part of the key of anything cached per palette."""
+    return _generations.get(name, 0)
+
+
+def _discover_palettes():
+    if PALETTE_DIR.is_dir():
+        for path in sorted(PALETTE_DIR.glob("*.json")):
+            if _PALETTE_NAME.match(path.stem) and path.stem not in _palette_sources:
+                register_palette(path.stem, path)
+
+
+def available_palettes():
+    """{name: loaded?} for every registered or discovered palette."""
+    _discover_palettes()
+    return {name: name in _palettes for name in sorted(_palette_sources)}
+
+
+def warm_palette(name=DEFAULT_PALETTE):
+    """get_palette(name) with its lookup tables built (see Palette.warm)."""
+    palette = get_palette(name)
+    if not palette.warmed:
+        palette.warm()
+    return palette
+
+
+def palette_is_warm(name=DEFAULT_PALETTE):
+    """Whether the named palette is loaded and warmed, i.e. queries won't build anything."""
+    palette = _palettes.get(name)
+    return palette is not None and palette.warmed
+
+
+def get_palette(name=DEFAULT_PALETTE):
+    """The named palette, loaded (from its compiled artifact) on first use."""
+    palette = _palettes.get(name)
+    if palette is not None:
+        return palette
+
+    if name not in _palette_sources:
+        _discover_palettes()
+    with _palettes_lock:
+        palette = _palettes.get(name)
+        if palette is None:
+            source = _palette_sources.get(name)
+            if source is None:
+                raise UnknownPaletteError(f"Unknown palette '{name}'")
+            palette = Palette(*source(), key=name)
+            _palettes[name] = palette
+    return palette
@@ -0,0 +1,201 @@
+# helpers/palette_compiler.py
+#
+# Compiles a {name: "#RRGGBB"} palette into a flat binary artifact that loads
+# with a single read and no per-entry parsing:
+#
+#   header   magic, format version, entry count, names blob size
+#   rgb      uint8   (N, 3)
+#   lab      float64 (N, 3)
+#   offsets  uint32  (N + 1)   byte offsets of each name in the blob
+#   names    UTF-8 blob
+#
+#   python -m helpers.palette_compiler   # (re)build the COLOR_DB artifact
+
+import json
+import os
+import re
+import struct
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from helpers.colorspace import srgb_to_lab
+
+ARTIFACT_DIR = Path(os.environ.get("COLOR_ARTIFACT_DIR", Path(__file__).resolve().parent.parent / ".cache"))
+COLOR_DB_SOURCE = Path(__file__).resolve().parent / "color_db.py"
+COLOR_DB_ARTIFACT = ARTIFACT_DIR / "color_db.cpal"
+
+MAGIC = b"CPAL"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sIII")
+
+_HEX = re.compile(r'^#[0-9A-Fa-f]{6}$')
+
+
+class PaletteCompileError(ValueError):
+    pass
+
+
+class PackedNames:
+    """Read-only sequence of names decoded on access from a UTF-8 blob."""
+
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def compile_palette(color_map):
+    """Validate and deduplicate a palette.
+
+    Returns (names, rgb, duplicates). When several names share a hex value the
+    first one is kept, which is also the entry a linear nearest-match scan
+    would have returned.
+    """
+    names = []
+    hex_values = []
+    seen = {}
+    duplicates = []
+    errors = []
+
+    for name, hex_color in color_map.items():
+        if not isinstance(name, str) or not name.strip():
+            errors.append(f"invalid name {name!r}")
+            continue
+        if not isinstance(hex_color, str) or not _HEX.match(hex_color):
+            errors.append(f"{name}: invalid hex {hex_color!r}")
+            continue
+        key = hex_color.upper()
+        if key in seen:
+            duplicates.append((name, seen[key], key))
+            continue
+        seen[key] = name
+        names.append(name)
+        hex_values.append(int(key[1:], 16))
+
+    if errors:
+        raise PaletteCompileError("; ".join(errors))
+    if not names:
+        raise PaletteCompileError("palette is empty")
+
+    packed = np.array(hex_values, dtype=np.uint32)
+    rgb = np.stack(((packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF), axis=1).astype(np.uint8)
+    return names, rgb, duplicates
+
+
+def encode_artifact(names, rgb):
+    encoded = [n.encode("utf-8") for n in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    blob = b"".join(encoded)
+    lab = srgb_to_lab(rgb).astype(np.float64)
+
+    rgb_bytes = np.ascontiguousarray(rgb, dtype=np.uint8).tobytes()
+    # Keep the float64 Lab block 8-byte aligned for zero-copy views
+    pad = -(_HEADER.size + len(rgb_bytes)) % 8
+    return b"".join((
+        _HEADER.pack(MAGIC, FORMAT_VERSION, len(names), len(blob)),
+        rgb_bytes,
+        b"\0" * pad,
+        lab.tobytes(),
+        offsets.tobytes(),
+        blob,
+    ))
+
+
+def decode_artifact(data):
+    """Return (names, rgb, lab) as zero-copy views over the artifact bytes."""
+    magic, version, count, blob_size = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise PaletteCompileError("not a compatible palette artifact")
+
+    pos = _HEADER.size
+    rgb = np.frombuffer(data, dtype=np.uint8, count=count * 3, offset=pos).reshape(count, 3)
+    pos += count * 3
+    pos += -pos % 8
+    lab = np.frombuffer(data, dtype=np.float64, count=count * 3, offset=pos).reshape(count, 3)
+    pos += count * 3 * 8
+    offsets = np.frombuffer(data, dtype=np.uint32, count=count + 1, offset=pos)
+    pos += (count + 1) * 4
+    blob = memoryview(data)[pos:pos + blob_size]
+    if len(blob) != blob_size:
+        raise PaletteCompileError("truncated palette artifact")
+
+    return PackedNames(blob, offsets.tolist()), rgb, lab
+
+
+def write_artifact(path, names, rgb):
+    """Atomically write a compiled artifact to path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(encode_artifact(names, rgb))
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def read_artifact(path):
+    return decode_artifact(Path(path).read_bytes())
+
+
+def load_compiled(source, artifact, read_source):
+    """(names, rgb, lab) from artifact when it is newer than source.
+
+    Otherwise calls read_source() for the {name: hex} dict, compiles it and
+    rewrites the artifact.
+    """
+    try:
+        if Path(artifact).stat().st_mtime >= Path(source).stat().st_mtime:
+            return read_artifact(artifact)
+    except (OSError, PaletteCompileError, struct.error):
+        pass
+
+    names, rgb, _ = compile_palette(read_source())
+    try:
+        write_artifact(artifact, names, rgb)
+    except OSError as e:
+        print(f"⚠️ Could not write palette artifact {artifact}: {e}")
+    return names, rgb, srgb_to_lab(rgb)
+
+
+def _read_color_db():
+    from helpers.color_db import COLOR_DB
+    return COLOR_DB
+
+
+def load_color_db():
+    """COLOR_DB, without importing the 1,800-line dict literal when the artifact is fresh."""
+    return load_compiled(COLOR_DB_SOURCE, COLOR_DB_ARTIFACT, _read_color_db)
+
+
+def load_palette_json(path):
+    """A {name: "#RRGGBB"} JSON palette file, compiled next to the COLOR_DB artifact."""
+    path = Path(path)
+    return load_compiled(path, ARTIFACT_DIR / f"palette_{path.stem}.cpal",
+                         lambda: json.loads(path.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    from helpers.color_db import COLOR_DB
+
+    names, rgb, duplicates = compile_palette(COLOR_DB)
+    for name, kept, hex_color in duplicates:
+        print(f"Duplicate {hex_color}: dropped '{name}', kept '{kept}'")
+    write_artifact(COLOR_DB_ARTIFACT, names, rgb)
+    print(f"Wrote {len(names)} colors to {COLOR_DB_ARTIFACT} "
+          f"({COLOR_DB_ARTIFACT.stat().st_size} bytes, {len(duplicates)} duplicates removed)")
@@ -0,0 +1,138 @@
+# helpers/rgb_lut.py
+#
+# Precomputed nearest-palette-index table for every 24-bit RGB value.
+# The table lives on disk next to a hash of the palette it was built from and
+# is memory-mapped read-only, so every worker shares the same page-cache pages.
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+LUT_DIR = Path(os.environ.get("COLOR_LUT_DIR", Path(__file__).resolve().parent.parent / ".cache"))
+
+# Bump when the table layout or the matching rule changes
+LUT_FORMAT_VERSION = 1
+
+TABLE_SIZE = 1 << 24
+
+# Side length of the RGB cubes the builder resolves at once
+_BLOCK = 8
+_BLOCKS_PER_AXIS = 256 // _BLOCK
+
+
+def palette_hash(rgb):
+    """Stable hash of the palette points (and their order) the table indexes into."""
+    digest = hashlib.sha256()
+    digest.update(f"rgb-lut-v{LUT_FORMAT_VERSION}".encode())
+    digest.update(np.ascontiguousarray(rgb, dtype=np.uint8).tobytes())
+    return digest.hexdigest()
+
+
+def lut_dtype(size):
+    return np.uint16 if size <= np.iinfo(np.uint16).max else np.uint32
+
+
+def lut_path(rgb, palette_name="default"):
+    return LUT_DIR / f"rgb_lut_{palette_name}_{palette_hash(rgb)[:16]}.bin"
+
+
+def lut_is_built(rgb, palette_name="default"):
+    """Whether an up-to-date table for this palette is already on disk."""
+    path = lut_path(rgb, palette_name)
+    return path.exists() and path.stat().st_size == TABLE_SIZE * np.dtype(lut_dtype(len(rgb))).itemsize
+
+
+def pack_rgb(rgb):
+    """Pack (..., 3) 0–255 RGB values into 24-bit table offsets."""
+    rgb = np.asarray(rgb, dtype=np.int64)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def build_lut(rgb):
+    """Compute the exact nearest palette index for all 16.7M RGB values.
+
+    Works cube by cube: a palette entry can only win somewhere inside a cube if
+    its distance to the cube is no larger than the smallest "farthest corner"
+    distance of any entry, so each cube is resolved against a handful of
+    candidates. Ties go to the lower palette index, like a linear scan.
+    """
+    points = np.asarray(rgb, dtype=np.int32)
+    table = np.empty(TABLE_SIZE, dtype=lut_dtype(len(points)))
+
+    axis = np.arange(_BLOCK)
+    offsets = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+    packed_offsets = pack_rgb(offsets)
+
+    # Squared per-axis distances from every cube slab to every entry. Box
+    # distances are separable, so the 3-D bounds are sums of three table rows
+    low = (np.arange(_BLOCKS_PER_AXIS) * _BLOCK)[:, None, None]
+    high = low + (_BLOCK - 1)
+    gap = np.maximum(low - points[None], 0) + np.maximum(points[None] - high, 0)
+    gap_sq = gap * gap
+    far = np.maximum(np.abs(points[None] - low), np.abs(points[None] - high))
+    far_sq = far * far
+
+    for r in range(_BLOCKS_PER_AXIS):
+        for g in range(_BLOCKS_PER_AXIS):
+            dist_min = gap_sq[r, :, 0] + gap_sq[g, :, 1] + gap_sq[:, :, 2]
+            dist_max = far_sq[r, :, 0] + far_sq[g, :, 1] + far_sq[:, :, 2]
+            limit = dist_max.min(axis=1)
+
+            for b in range(_BLOCKS_PER_AXIS):
+                candidates = np.flatnonzero(dist_min[b] <= limit[b])
+                corner = np.array([r, g, b]) * _BLOCK
+                diff = (corner + offsets)[:, None, :] - points[candidates][None, :, :]
+                dist_sq = np.einsum('cnd,cnd->cn', diff, diff)
+                table[pack_rgb(corner) + packed_offsets] = candidates[np.argmin(dist_sq, axis=1)]
+
+    return table
+
+
+def load_lut(rgb, palette_name="default"):
+    """Memory-map the table for this palette, building it first if missing or stale."""
+    path = lut_path(rgb, palette_name)
+    dtype = lut_dtype(len(rgb))
+
+    if not lut_is_built(rgb, palette_name):
+        write_table(path, build_lut(rgb))
+        # Exactly 16 hash characters, so "brand" never matches "brand_x" tables
+        remove_stale_tables(path, f"rgb_lut_{palette_name}_{'?' * 16}.bin")
+
+    return np.memmap(path, dtype=dtype, mode="r", shape=(TABLE_SIZE,))
+
+
+def write_table(path, table):
+    """Write an array to path atomically, so other workers never map a partial table."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            table.tofile(f)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def remove_stale_tables(current, pattern):
+    """Delete files in current's directory matching a glob pattern, except current."""
+    for old in current.parent.glob(pattern):
+        if old != current:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    import sys
+    from helpers.palette import DEFAULT_PALETTE, get_palette
+
+    for name in sys.argv[1:] or [DEFAULT_PALETTE]:
+        palette = get_palette(name)
+        load_lut(palette.rgb, name)
+        print(f"RGB lookup table ready: {lut_path(palette.rgb, name)}")
@@ -1,28 +1,80 @@
 import os
+import asyncio
+import copy
 import json
-from dotenv import load_dotenv
-from openai import OpenAI
-from helpers.color_analysis import analyze_color as analyze_color_util
+import re
+from helpers.color_analysis import analyze_color as analyze_color_util, hex_to_rgb
+from helpers.colora import nearest_color
+from helpers.contrast import contrast_record, profile_contrasts
+from helpers.palette import DEFAULT_PALETTE
+from helpers.lru_cache import copy_result
+from helpers.season_cache import SeasonResultCache, trait_signature
+from helpers.season_classifier import CONFIDENCE_THRESHOLD, classify_season
+from helpers.micro_batcher import MicroBatcher
+from helpers.single_flight import FLIGHTS, SingleFlight
 
-# Load environment variables
-load_dotenv()
+# Pooled connections to the LLM API and the per-call budget. A slow completion
+# only holds its own request; the event loop keeps serving everything else.
+LLM_MAX_CONNECTIONS = int(os.environ.get("SEASON_LLM_MAX_CONNECTIONS", "20"))
+LLM_TIMEOUT = float(os.environ.get("SEASON_LLM_TIMEOUT", "20"))
+LLM_CONNECT_TIMEOUT = 5.0
+LLM_MAX_RETRIES = 1
 
-# Initialize OpenAI client (no need to pass API key manually if env var is set)
-client = OpenAI()
+# LLM-bound profiles arriving within BATCH_WINDOW seconds of each other share
+# one prompt, up to BATCH_MAX_SIZE per call. SEASON_BATCH_WINDOW_MS=0 disables.
+BATCH_WINDOW = float(os.environ.get("SEASON_BATCH_WINDOW_MS", "10")) / 1000
+BATCH_MAX_SIZE = int(os.environ.get("SEASON_BATCH_MAX_SIZE", "8"))
+
+# On shutdown, batches still waiting on the LLM after this many seconds are cancelled
+BATCH_SHUTDOWN_TIMEOUT = 5.0
+
+# Async OpenAI client, created on first use (the SDK is slow to import and
+# needs OPENAI_API_KEY, which main.py loads from .env before serving)
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        _client = AsyncOpenAI(
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            max_retries=LLM_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=LLM_MAX_CONNECTIONS)
+            )
+        )
+    return _client
+
+def preload_client_sdk():
+    """Import the LLM SDK ahead of the first season request (call off the event loop)."""
+    import httpx
+    import openai
+
+async def close_client():
+    global _client
+    # Answer (or cancel) queued batch items while the client still exists
+    await _llm_batcher.close(BATCH_SHUTDOWN_TIMEOUT)
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+# Finished results by trait signature, in memory and on disk
+_season_cache = SeasonResultCache()
+
+# Concurrent requests with the same signature share one analysis
+_season_flight = SingleFlight("analyze_color_season")
+
+def close_season_cache():
+    _season_cache.close()
 
 SEASON_CLASSIFICATION_PROMPT = """
 You are a certified Personal Color Analyst specializing in the 12-season system.
-You will receive detailed color analysis data for SKIN, EYES, and HAIR.
-
-Each contains:
-- temperature (Warm / Cool / Neutral)
-- value (Very Light / Light / Medium / Dark / Very Dark)
-- chroma (Bright / Muted / Soft)
-- saturation (0–1)
-- lightness (0–1)
-- hue_degree (0–360)
-- closest standard color name
-- and overall contrast level (auto-calculated based on skin–hair–eye difference)
+You will receive color analysis data for SKIN, EYES, and HAIR (temperature,
+value, chroma, saturation, lightness, hue_degree, closest color name) and the
+computed contrast between them: per pair ΔL*, ΔE2000, chroma difference and
+WCAG luminance ratio, plus an overall Low / Medium / High level.
 
 Your task:
 Determine the most accurate **12-season color type**:
@@ -51,6 +103,23 @@ OUTPUT FORMAT (STRICT JSON):
 Here are the person's traits:
 {traits}
 """
+
+# Same instructions, for several people in one call
+SEASON_BATCH_PROMPT = SEASON_CLASSIFICATION_PROMPT.split("OUTPUT FORMAT")[0] + """OUTPUT FORMAT (STRICT JSON), one result per profile, echoing its "id":
+{
+  "results": [
+    {
+      "id": 0,
+      "season": "Exact season name",
+      "dominant_trait": "Main reason: undertone / value / chroma / contrast",
+      "reasoning": "Short explanation of why this season fits"
+    }
+  ]
+}
+
+Here are the profiles:
+{profiles}
+"""
 # async def analyze_color_season(traits: dict) -> dict:
 #     """
 #     traits: dict containing skin, eyes, hair (each with match + analysis)
@@ -113,7 +182,256 @@ def clean_hex_value(hex_str):
     clean = ''.join(c.lower() for c in hex_str if c.lower() in '0123456789abcdef')
     return f"#{clean}" if clean else ""
 
-async def analyze_color_season(traits: dict) -> dict:
+def closest_palette_name(hex_value, palette, fallback):
+    """Name of the closest shade in the requested palette, or fallback if unmatched."""
+    try:
+        return nearest_color(hex_value, palette=palette)["closest_name"]
+    except (ValueError, LookupError):
+        return fallback
+
+async def classify_with_llm(payload: dict, emit=None) -> dict:
+    """Ask the LLM for one profile's season ({skin, eyes, hair, contrast} payload).
+
+    With emit, the completion is streamed and each text delta is passed on
+    as emit("token", {"text": ...}) as it arrives.
+    """
+    contrast = payload.get("contrast")
+    # Prepare the final prompt with validation
+    try:
+        traits_json = json.dumps(payload, indent=2, ensure_ascii=False)
+        # The prompt's JSON example has literal braces, so no str.format()
+        prompt = SEASON_CLASSIFICATION_PROMPT.replace("{traits}", traits_json)
+
+        print("\n🔍 Final prompt to LLM:")
+        print("-" * 50)
+        print(prompt)
+        print("-" * 50)
+
+    except Exception as e:
+        error_msg = f"Error creating prompt: {str(e)}"
+        print(f"❌ {error_msg}")
+        return {
+            "error": "Failed to prepare analysis",
+            "details": error_msg,
+            "prompt_traits": payload
+        }
+
+    try:
+        print("\n🔄 Sending request to OpenAI...")
+        response = await get_client().chat.completions.create(
+            model="gpt-4.1-mini",
+            messages=[
+                {"role": "system", "content": "You are an expert certified Personal Color Analyst."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            max_tokens=350,
+            stream=emit is not None
+        )
+
+        print("\n✅ Received response from OpenAI")
+
+        # Extract the raw content safely
+        try:
+            if emit is None:
+                raw = response.choices[0].message.content
+            else:
+                parts = []
+                async for chunk in response:
+                    piece = chunk.choices[0].delta.content if chunk.choices else None
+                    if piece:
+                        parts.append(piece)
+                        emit("token", {"text": piece})
+                raw = "".join(parts)
+            print("\n🔍 Raw model output:")
+            print("-" * 50)
+            print(raw)
+            print("-" * 50)
+
+            # Try to parse the JSON response
+            try:
+                # Look for JSON in the response
+                json_match = re.search(r'\{.*\}', raw, re.DOTALL)
+                if json_match:
+                    parsed = json.loads(json_match.group(0))
+                    print("✅ Successfully parsed JSON response:")
+                    print(json.dumps(parsed, indent=2))
+                    if isinstance(parsed, dict) and contrast is not None:
+                        parsed.setdefault("contrast", contrast)
+                    return {
+                        "status": "success",
+                        "season_analysis": parsed
+                    }
+            except json.JSONDecodeError as je:
+                print(f"⚠️ Could not parse JSON response: {je}")
+
+            # If we get here, return the raw output for fallback processing
+            return {
+                "status": "partial_success",
+                "raw_output": raw
+            }
+
+        except (IndexError, AttributeError) as e:
+            error_msg = f"Unexpected response format: {str(e)}"
+            print(f"❌ {error_msg}")
+            print("Full response:", response)
+            return {
+                "error": "Invalid response from analysis service",
+                "details": error_msg,
+                "response": str(response)
+            }
+
+    except Exception as e:
+        error_msg = f"Error calling OpenAI API: {str(e)}"
+        print(f"❌ {error_msg}")
+        return {
+            "error": "Analysis service unavailable",
+            "details": error_msg
+        }
+
+def parse_batch_results(raw):
+    """{id: result dict} from a batch completion.
+
+    Falls back to parsing each flat {...} object on its own when the whole
+    reply isn't valid JSON, so one malformed item doesn't lose the others.
+    """
+    items = None
+    match = re.search(r'\{.*\}', raw or "", re.DOTALL)
+    if match:
+        try:
+            items = json.loads(match.group(0)).get("results")
+        except (json.JSONDecodeError, AttributeError):
+            items = None
+    if not isinstance(items, list):
+        items = []
+        for obj in re.findall(r'\{[^{}]*\}', raw or ""):
+            try:
+                items.append(json.loads(obj))
+            except json.JSONDecodeError:
+                continue
+
+    results = {}
+    for item in items:
+        if isinstance(item, dict) and isinstance(item.get("id"), int) and isinstance(item.get("season"), str):
+            results.setdefault(item.pop("id"), item)
+    return results
+
+async def classify_batch_with_llm(payloads: list) -> list:
+    """classify_with_llm() for several profiles in one prompt.
+
+    Profiles missing from (or malformed in) the reply are retried on their own.
+    """
+    if len(payloads) == 1:
+        return [await classify_with_llm(payloads[0])]
+
+    profiles = json.dumps([{"id": i, **p} for i, p in enumerate(payloads)], indent=2, ensure_ascii=False)
+    prompt = SEASON_BATCH_PROMPT.replace("{profiles}", profiles)
+
+    try:
+        print(f"\n🔄 Sending batch of {len(payloads)} profiles to OpenAI...")
+        response = await get_client().chat.completions.create(
+            model="gpt-4.1-mini",
+            messages=[
+                {"role": "system", "content": "You are an expert certified Personal Color Analyst."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            max_tokens=350 * len(payloads)
+        )
+        raw = response.choices[0].message.content
+    except Exception as e:
+        error_msg = f"Error calling OpenAI API: {str(e)}"
+        print(f"❌ {error_msg}")
+        return [{"error": "Analysis service unavailable", "details": error_msg} for _ in payloads]
+
+    parsed = parse_batch_results(raw)
+    results = [None] * len(payloads)
+    for i, payload in enumerate(payloads):
+        if i in parsed:
+            if payload.get("contrast") is not None:
+                parsed[i].setdefault("contrast", payload["contrast"])
+            results[i] = {"status": "success", "season_analysis": parsed[i]}
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        print(f"⚠️ Batch reply had no usable result for profiles {missing}, retrying them individually")
+        retried = await asyncio.gather(*(classify_with_llm(payloads[i]) for i in missing))
+        for i, result in zip(missing, retried):
+            results[i] = result
+    print(f"✅ Batch of {len(payloads)} classified ({len(missing)} retried)")
+    return results
+
+_llm_batcher = MicroBatcher(classify_batch_with_llm, BATCH_WINDOW, BATCH_MAX_SIZE)
+FLIGHTS["season_llm_batch"] = _llm_batcher
+
+def season_signature(traits, palette, reasoning):
+    """Cache key for the cleaned skin/eyes/hair hex colors, or None if any is unusable."""
+    try:
+        rgb = [hex_to_rgb(clean_hex_value(traits[t]['match']['hex'])) for t in ('skin', 'eyes', 'hair')]
+    except (KeyError, TypeError, ValueError):
+        return None
+    return trait_signature(rgb, palette, reasoning)
+
+async def analyze_color_season(traits: dict, palette: str = DEFAULT_PALETTE, reasoning: bool = False) -> dict:
+    """Season result for the traits; repeat (or near-identical) profiles come
+    from the result cache and never reach the classifier or the LLM, and
+    identical concurrent requests share one in-flight analysis."""
+    key = season_signature(traits, palette, reasoning)
+    if key is None:
+        return await _analyze_color_season(traits, palette, reasoning)
+
+    cached = await _season_cache.get(key)
+    if cached is not None:
+        print(f"✅ Season cache hit: {key}")
+        return cached
+
+    async def compute():
+        result = await _analyze_color_season(traits, palette, reasoning)
+        if result.get("status") == "success":
+            await _season_cache.put(key, result)
+        return result
+
+    return copy_result(await _season_flight.do(key, compute))
+
+async def stream_color_season(traits: dict, palette: str = DEFAULT_PALETTE, reasoning: bool = False):
+    """analyze_color_season() as an async iterator of (event, data) pairs.
+
+    Yields "traits" (prepared traits, contrast and the local classification)
+    as soon as they are computed, "token" for each streamed LLM text delta,
+    then "result" with the same dict analyze_color_season() returns.
+    """
+    key = season_signature(traits, palette, reasoning)
+    cached = await _season_cache.get(key) if key is not None else None
+    if cached is not None:
+        yield "result", cached
+        return
+
+    queue = asyncio.Queue()
+
+    def emit(event, data):
+        queue.put_nowait((event, data))
+
+    async def run():
+        try:
+            result = await _analyze_color_season(traits, palette, reasoning, emit=emit)
+            if key is not None and result.get("status") == "success":
+                await _season_cache.put(key, result)
+            emit("result", result)
+        finally:
+            queue.put_nowait(None)
+
+    task = asyncio.ensure_future(run())
+    try:
+        while (item := await queue.get()) is not None:
+            yield item
+        await task
+    finally:
+        # The client went away mid-stream
+        if not task.done():
+            task.cancel()
+
+async def _analyze_color_season(traits: dict, palette: str = DEFAULT_PALETTE, reasoning: bool = False,
+                                emit=None) -> dict:
     print("\n===== ENTERING analyze_color_season =====")
     print("Raw input traits:", json.dumps(traits, indent=2))
     
@@ -136,7 +454,9 @@ async def analyze_color_season(traits: dict) -> dict:
             
         for trait_type in required_traits:
             try:
-                trait_data = traits[trait_type].copy()
+                # Deep copy: cleaning below must not touch the caller's traits,
+                # which the response echoes as traits_received
+                trait_data = copy.deepcopy(traits[trait_type])
                 print(f"\n🔍 Processing {trait_type} trait:")
                 print("Raw trait data:", json.dumps(trait_data, indent=2))
                 
@@ -210,7 +530,7 @@ async def analyze_color_season(traits: dict) -> dict:
                 # Prepare trait data with actual or default values
                 trait_info = {
                     'hex': hex_value,
-                    'closest_name': analysis.get('closest_name', 'Unknown'),
+                    'closest_name': closest_palette_name(hex_value, palette, analysis.get('closest_name', 'Unknown')),
                     'temperature': analysis.get('temperature', 'Neutral'),
                     'value': analysis.get('value', 'Medium'),
                     'chroma': analysis.get('chroma', 'Medium'),
@@ -232,85 +552,39 @@ async def analyze_color_season(traits: dict) -> dict:
                     "analysis_data": analysis
                 }
 
-        # Prepare the final prompt with validation
-        try:
-            traits_json = json.dumps(prompt_traits, indent=2)
-            prompt = SEASON_CLASSIFICATION_PROMPT.format(traits=traits_json)
-            
-            print("\n🔍 Final prompt to LLM:")
-            print("-" * 50)
-            print(prompt)
-            print("-" * 50)
-            
-        except Exception as e:
-            error_msg = f"Error creating prompt: {str(e)}"
-            print(f"❌ {error_msg}")
-            return {
-                "error": "Failed to prepare analysis",
-                "details": error_msg,
-                "prompt_traits": prompt_traits
-            }
-
-        try:
-            print("\n🔄 Sending request to OpenAI...")
-            response = client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=[
-                    {"role": "system", "content": "You are an expert certified Personal Color Analyst."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=350
-            )
-            
-            print("\n✅ Received response from OpenAI")
-            
-            # Extract the raw content safely
+        # Contrast between the features is measured rather than left to the model
+        contrast = None
+        if len(prompt_traits) == len(required_traits):
             try:
-                raw = response.choices[0].message.content
-                print("\n🔍 Raw model output:")
-                print("-" * 50)
-                print(raw)
-                print("-" * 50)
-                
-                # Try to parse the JSON response
-                try:
-                    # Look for JSON in the response
-                    json_match = re.search(r'\{.*\}', raw, re.DOTALL)
-                    if json_match:
-                        parsed = json.loads(json_match.group(0))
-                        print("✅ Successfully parsed JSON response:")
-                        print(json.dumps(parsed, indent=2))
-                        return {
-                            "status": "success",
-                            "season_analysis": parsed
-                        }
-                except json.JSONDecodeError as je:
-                    print(f"⚠️ Could not parse JSON response: {je}")
-                
-                # If we get here, return the raw output for fallback processing
+                rgb = [[hex_to_rgb(prompt_traits[t]['hex']) for t in required_traits]]
+                contrasts = profile_contrasts(rgb)
+                contrast = contrast_record(contrasts, 0)
+                print(f"✅ Contrast: {contrast['level']} (ΔL* {contrast['lightness_contrast']})")
+            except ValueError as e:
+                print(f"⚠️ Could not compute contrast: {str(e)}")
+
+        # Confident local classifications skip the LLM entirely unless the
+        # caller asked for its narrative reasoning
+        if contrast is not None:
+            local = classify_season(prompt_traits, contrasts)
+            local["contrast"] = contrast
+            print(f"✅ Local classification: {local['season']} (confidence {local['confidence']})")
+            if emit is not None:
+                emit("traits", {"traits": prompt_traits, "contrast": contrast, "local": local})
+            if not reasoning and local["confidence"] >= CONFIDENCE_THRESHOLD:
                 return {
-                    "status": "partial_success",
-                    "raw_output": raw
+                    "status": "success",
+                    "season_analysis": local
                 }
-                
-            except (IndexError, AttributeError) as e:
-                error_msg = f"Unexpected response format: {str(e)}"
-                print(f"❌ {error_msg}")
-                print("Full response:", response)
-                return {
-                    "error": "Invalid response from analysis service",
-                    "details": error_msg,
-                    "response": str(response)
-                }
-                
-        except Exception as e:
-            error_msg = f"Error calling OpenAI API: {str(e)}"
-            print(f"❌ {error_msg}")
-            return {
-                "error": "Analysis service unavailable",
-                "details": error_msg
-            }
+
+        # The LLM call is micro-batched with other requests' profiles when
+        # batching is enabled; streamed calls go out on their own
+        payload = {**prompt_traits, "contrast": contrast}
+        if emit is not None:
+            return await classify_with_llm(payload, emit)
+        if BATCH_WINDOW > 0:
+            return await _llm_batcher.submit(payload)
+        return await classify_with_llm(payload)
 
     except Exception as e:
         import traceback
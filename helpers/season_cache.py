@@ -0,0 +1,199 @@
+# helpers/season_cache.py
+#
+# Season results keyed by a quantized signature of the three trait colors.
+# Lookups go to an in-memory LRU first, then to an SQLite file that survives
+# restarts; entries expire after a TTL and the least recently used rows are
+# dropped once the file holds more than SEASON_CACHE_MAX_ROWS. SQLite calls run
+# in a worker thread, never on the event loop.
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from helpers.colorspace import srgb_to_lab
+from helpers.lru_cache import CACHES, LRUCache, copy_result
+
+SEASON_CACHE_PATH = Path(os.environ.get(
+    "SEASON_CACHE_PATH", Path(__file__).resolve().parent.parent / ".cache" / "season_results.sqlite3"))
+SEASON_CACHE_TTL = float(os.environ.get("SEASON_CACHE_TTL", str(30 * 24 * 3600)))
+SEASON_CACHE_MAX_ROWS = int(os.environ.get("SEASON_CACHE_MAX_ROWS", "100000"))
+SEASON_CACHE_MEMORY_SIZE = int(os.environ.get("SEASON_CACHE_MEMORY_SIZE", "2048"))
+
+# Lab grid step for the signature; colors in the same cell (ΔE76 < ~3.5)
+# share a result. Bump SIGNATURE_VERSION when this, the result shape or the
+# local classifier changes.
+LAB_STEP = 2.0
+SIGNATURE_VERSION = 2
+
+# Expired and excess rows are purged once every this many writes
+_PURGE_EVERY = 256
+
+# Memory-tier hits refresh the rows' disk access time in batches of this size
+# (and with every write), so hot entries aren't the first evicted on disk
+_TOUCH_BATCH = 64
+
+
+def trait_signature(rgb, palette, reasoning=False):
+    """Cache key for (3, 3) skin/eyes/hair RGB values plus the request options."""
+    cells = np.rint(srgb_to_lab(np.asarray(rgb, dtype=np.float64)) / LAB_STEP).astype(np.int64)
+    colors = ";".join(",".join(str(v) for v in cell) for cell in cells.tolist())
+    return f"v{SIGNATURE_VERSION}|{palette}|{int(bool(reasoning))}|{colors}"
+
+
+class SQLiteResultStore:
+    """JSON values in an SQLite table with TTL and row-count eviction."""
+
+    def __init__(self, name, path, ttl, max_rows):
+        self.name = name
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._conn = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        CACHES[name] = self
+
+    def _connect(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        return self._conn
+
+    def get(self, key):
+        """(created, value) for a live entry, or None."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT created, value FROM results WHERE key = ? AND created > ?",
+                               (key, now - self.ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return row[0], json.loads(row[1])
+
+    def touch(self, keys):
+        """Mark keys as used now, for the least-recently-used eviction."""
+        now = time.time()
+        with self._lock:
+            self._connect().executemany("UPDATE results SET accessed = ? WHERE key = ?",
+                                        [(now, key) for key in keys])
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                         (key, json.dumps(value, ensure_ascii=False), now, now))
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 1:
+                self._purge(conn, now)
+
+    def _purge(self, conn, now):
+        removed = conn.execute("DELETE FROM results WHERE created <= ?", (now - self.ttl,)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_rows
+        if excess > 0:
+            removed += conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed LIMIT ?)",
+                (excess,)).rowcount
+        self.evictions += removed
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM results")
+            self.hits = self.misses = self.evictions = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self):
+        with self._lock:
+            size = self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "capacity": self.max_rows,
+                "size": size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SeasonResultCache:
+    """Two-tier (memory LRU, then SQLite) cache of season results."""
+
+    def __init__(self, path=SEASON_CACHE_PATH, ttl=SEASON_CACHE_TTL, max_rows=SEASON_CACHE_MAX_ROWS,
+                 memory_size=SEASON_CACHE_MEMORY_SIZE):
+        self.ttl = ttl
+        self.memory = LRUCache("season_result", memory_size)
+        self.disk = SQLiteResultStore("season_result_disk", path, ttl, max_rows)
+        self._touched = set()
+
+    async def get(self, key):
+        entry = self.memory.get(key)
+        if entry is None:
+            try:
+                entry = await asyncio.to_thread(self.disk.get, key)
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️ Season cache read failed: {e}")
+                return None
+            if entry is None:
+                return None
+            self.memory.put(key, entry)
+        else:
+            self._touched.add(key)
+            if len(self._touched) >= _TOUCH_BATCH:
+                await asyncio.to_thread(self._flush_touched, self._take_touched())
+
+        created, result = entry
+        if created + self.ttl <= time.time():
+            return None
+        return copy_result(result)
+
+    async def put(self, key, result):
+        result = copy_result(result)
+        self.memory.put(key, (time.time(), result))
+        await asyncio.to_thread(self._write, key, result, self._take_touched())
+
+    def _take_touched(self):
+        touched, self._touched = self._touched, set()
+        return touched
+
+    def _write(self, key, result, touched):
+        self._flush_touched(touched)
+        try:
+            self.disk.put(key, result)
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Season cache write failed: {e}")
+
+    def _flush_touched(self, keys):
+        if not keys:
+            return
+        try:
+            self.disk.touch(keys)
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Season cache touch failed: {e}")
+
+    def close(self):
+        self._flush_touched(self._take_touched())
+        self.disk.close()
@@ -0,0 +1,239 @@
+# helpers/season_classifier.py
+#
+# Deterministic 12-season classifier over analyze_color() outputs. Each
+# profile is reduced to four axes in [-1, 1]
+#
+#   undertone  warm (+) / cool (-)     mostly skin hue (golden vs pink)
+#   value      light (+) / deep (-)    weighted lightness, hair + eyes heavy
+#   chroma     bright (+) / muted (-)  weighted Lab C*, discounted for very
+#                                      dark or light features
+#   contrast   high (+) / low (-)      largest ΔL* between features
+#
+# and scored against a prototype per season. Confidence is the softmax
+# probability of the winner, so callers can fall back to the LLM when the
+# profile sits between seasons.
+
+import os
+
+import numpy as np
+from helpers.color_analysis import hex_to_rgb
+from helpers.colorspace import srgb_to_lab
+from helpers.contrast import profile_contrasts
+
+TRAITS = ("skin", "eyes", "hair")
+AXES = ("undertone", "value", "chroma", "contrast")
+
+SEASONS = [
+    "Light Spring", "Warm Spring", "Bright Spring",
+    "Light Summer", "Cool Summer", "Soft Summer",
+    "Soft Autumn", "Warm Autumn", "Dark Autumn",
+    "Bright Winter", "Cool Winter", "Dark Winter",
+]
+
+# (undertone, value, chroma, contrast) per season, in SEASONS order
+PROTOTYPES = np.array([
+    [0.5, 1.0, 0.3, -0.3],
+    [1.0, 0.3, 0.5, 0.0],
+    [0.5, 0.2, 1.0, 0.6],
+    [-0.5, 1.0, -0.3, -0.5],
+    [-1.0, 0.3, -0.2, -0.2],
+    [-0.5, 0.0, -1.0, -0.6],
+    [0.5, 0.0, -1.0, -0.6],
+    [1.0, -0.3, -0.2, -0.2],
+    [0.5, -1.0, -0.2, 0.3],
+    [-0.5, -0.2, 1.0, 1.0],
+    [-1.0, -0.3, 0.5, 0.7],
+    [-0.5, -1.0, 0.2, 0.6],
+])
+
+# Skin undertone is the foundation, so it weighs most
+AXIS_WEIGHTS = np.array([1.5, 1.0, 1.0, 0.7])
+
+# Per-trait weights (skin, eyes, hair) when averaging each axis
+UNDERTONE_WEIGHTS = np.array([0.6, 0.15, 0.25])
+VALUE_WEIGHTS = np.array([0.3, 0.3, 0.4])
+CHROMA_WEIGHTS = np.array([0.4, 0.3, 0.3])
+
+# analyze_color() calls nearly every skin tone "Warm" (hue < 60°), so undertone
+# is read from hue directly: skin hue around 16° is neutral, yellower is warm,
+# pinker is cool
+SKIN_NEUTRAL_HUE = 16.0
+SKIN_HUE_SPAN = 10.0
+
+# Lab C* (skin, eyes, hair) mapped to chroma 0, and the span to reach ±1.
+# HLS saturation calls every near-black feature muted; C* does not. Golden
+# skin runs ~30 C* against ~12 for pink, so skin sits higher to keep warmth
+# from reading as brightness.
+PROFILE_CHROMA_MIDPOINT = np.array([30.0, 20.0, 30.0])
+PROFILE_CHROMA_SPAN = 15.0
+
+# Within this many L* of black or white a feature says little about chroma
+# (black hair is neither bright nor muted), so its chroma vote fades out
+CHROMA_RELIABLE_L = 30.0
+
+# How much more the value axis weighs for a very light or deep profile: a
+# deep complexion must not land in a light season for matching on chroma
+VALUE_EMPHASIS = 1.5
+
+# Hair below this saturation reads as ash (cool-leaning)
+ASH_SATURATION = 0.2
+
+# ΔL* mapped to contrast 0, and the span to reach ±1
+CONTRAST_MIDPOINT = 35.0
+CONTRAST_SPAN = 15.0
+
+# Softmax sharpness over negative squared prototype distances
+SOFTMAX_SCALE = 4.0
+
+# Shade-to-season fit: Lab hue angle (degrees) of the warmest hue, and the
+# L* / C* that map to 0 on the value and chroma axes with the span to reach ±1
+SHADE_WARM_HUE = 70.0
+SHADE_NEUTRAL_CHROMA = 20.0
+SHADE_VALUE_MIDPOINT, SHADE_VALUE_SPAN = 55.0, 30.0
+SHADE_CHROMA_MIDPOINT, SHADE_CHROMA_SPAN = 35.0, 25.0
+
+# Below this confidence the caller should ask the LLM instead
+CONFIDENCE_THRESHOLD = float(os.environ.get("SEASON_LOCAL_CONFIDENCE", "0.5"))
+
+
+def trait_warmth(hue, saturation):
+    """(M, 3) warm (+1) to cool (-1) scores per trait from hue degrees and saturation."""
+    hue = np.asarray(hue, dtype=np.float64)
+    # Signed hue so pinks just below 360° sit next to reds at 0°
+    signed = np.where(hue > 180, hue - 360, hue)
+    warm_hue = (signed >= -60) & (signed < 60)
+
+    skin = np.clip((signed[:, 0] - SKIN_NEUTRAL_HUE) / SKIN_HUE_SPAN, -1, 1)
+    # Brown / hazel / amber eyes are warm, blue / grey cool, green neutral
+    eyes = np.where(warm_hue[:, 1], 1.0, np.where((hue[:, 1] >= 160) & (hue[:, 1] <= 300), -1.0, 0.0))
+    # Golden and red hair is warm, ash (low saturation) hair cool-leaning
+    hair = np.where(saturation[:, 2] < ASH_SATURATION, -0.5, np.where(warm_hue[:, 2], 1.0, -1.0))
+    return np.stack((skin, eyes, hair), axis=1)
+
+
+def trait_chroma(lab):
+    """(M, 3) bright (+1) to muted (-1) scores per trait from (M, 3, 3) Lab values."""
+    lab = np.asarray(lab, dtype=np.float64)
+    chroma = np.clip((np.hypot(lab[..., 1], lab[..., 2]) - PROFILE_CHROMA_MIDPOINT) / PROFILE_CHROMA_SPAN, -1, 1)
+    reliable = np.clip(np.minimum(lab[..., 0], 100 - lab[..., 0]) / CHROMA_RELIABLE_L, 0, 1)
+    return chroma * reliable
+
+
+def profile_features(hue, lightness, saturation, lab, lightness_contrast):
+    """(M, 4) axis values from (M, 3) trait arrays ordered skin, eyes, hair, the
+    traits' (M, 3, 3) Lab values and each profile's largest ΔL* (see
+    helpers.contrast)."""
+    lightness = np.asarray(lightness, dtype=np.float64)
+    saturation = np.asarray(saturation, dtype=np.float64)
+
+    undertone = trait_warmth(hue, saturation) @ UNDERTONE_WEIGHTS
+    value = np.clip((lightness @ VALUE_WEIGHTS - 0.45) / 0.25, -1, 1)
+    chroma = np.clip(trait_chroma(lab) @ CHROMA_WEIGHTS, -1, 1)
+    contrast = np.clip((np.asarray(lightness_contrast) - CONTRAST_MIDPOINT) / CONTRAST_SPAN, -1, 1)
+    return np.stack((undertone, value, chroma, contrast), axis=1)
+
+
+class UnknownSeasonError(LookupError):
+    pass
+
+
+def season_index(name):
+    """Position of a season in SEASONS; accepts "Soft Autumn", "soft-autumn", "soft_autumn"."""
+    key = " ".join(str(name).replace("-", " ").replace("_", " ").split()).title()
+    try:
+        return SEASONS.index(key)
+    except ValueError:
+        raise UnknownSeasonError(f"Unknown season '{name}'") from None
+
+
+def shade_features(lab):
+    """(N, 3) undertone, value and chroma axes of palette shades from their Lab values."""
+    lab = np.asarray(lab, dtype=np.float64).reshape(-1, 3)
+    chroma = np.hypot(lab[:, 1], lab[:, 2])
+    hue = np.arctan2(lab[:, 2], lab[:, 1])
+    # Yellow-orange is warmest, blue coolest; greys carry no undertone
+    undertone = np.cos(hue - np.radians(SHADE_WARM_HUE)) * np.minimum(chroma / SHADE_NEUTRAL_CHROMA, 1)
+    value = np.clip((lab[:, 0] - SHADE_VALUE_MIDPOINT) / SHADE_VALUE_SPAN, -1, 1)
+    chroma = np.clip((chroma - SHADE_CHROMA_MIDPOINT) / SHADE_CHROMA_SPAN, -1, 1)
+    return np.stack((undertone, value, chroma), axis=1)
+
+
+def season_compatibility(lab):
+    """(N, 12) fit in (0, 1] of every shade to every season, in SEASONS order."""
+    diff = shade_features(lab)[:, None, :] - PROTOTYPES[None, :, :3]
+    return np.exp(-np.einsum('nsa,a->ns', diff * diff, AXIS_WEIGHTS[:3]))
+
+
+def profile_weights(features):
+    """(M, 4) per-profile AXIS_WEIGHTS, with value weighing more the further
+    the profile is from medium depth."""
+    weights = np.tile(AXIS_WEIGHTS, (len(features), 1))
+    weights[:, 1] *= 1 + VALUE_EMPHASIS * np.abs(features[:, 1])
+    return weights
+
+
+def season_probabilities(features):
+    """(M, 12) softmax scores of each profile against every season prototype."""
+    diff = features[:, None, :] - PROTOTYPES[None, :, :]
+    score = -SOFTMAX_SCALE * np.einsum('msa,ma->ms', diff * diff, profile_weights(features))
+    score -= score.max(axis=1, keepdims=True)
+    weights = np.exp(score)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def _describe(features):
+    undertone, value, chroma, contrast = features
+    words = [
+        "warm" if undertone > 0.25 else "cool" if undertone < -0.25 else "neutral",
+        "light" if value > 0.33 else "deep" if value < -0.33 else "medium-depth",
+        "bright" if chroma > 0.33 else "muted" if chroma < -0.33 else "moderate-chroma",
+        "high-contrast" if contrast > 0.33 else "low-contrast" if contrast < -0.33 else "medium-contrast",
+    ]
+    return ", ".join(words)
+
+
+def classify_seasons(traits_list, contrasts=None):
+    """Classify many profiles at once; see classify_season for the result shape.
+
+    contrasts is profile_contrasts() output for the same profiles, computed
+    from each trait's "hex" when not given.
+    """
+    rgb = np.array([[hex_to_rgb(t[trait]["hex"]) for trait in TRAITS] for t in traits_list], dtype=np.float64)
+    if contrasts is None:
+        contrasts = profile_contrasts(rgb)
+    hue = [[float(t[trait].get("hue_degree", 0)) for trait in TRAITS] for t in traits_list]
+    lightness = [[float(t[trait].get("lightness", 0.5)) for trait in TRAITS] for t in traits_list]
+    saturation = [[float(t[trait].get("saturation", 0.5)) for trait in TRAITS] for t in traits_list]
+
+    features = profile_features(hue, lightness, saturation, srgb_to_lab(rgb), contrasts["lightness_contrast"])
+    probabilities = season_probabilities(features)
+    weights = profile_weights(features)
+    best = probabilities.argmax(axis=1)
+
+    results = []
+    for row, season_index in enumerate(best):
+        axis_match = weights[row] * np.abs(features[row] * PROTOTYPES[season_index])
+        top = np.argsort(-probabilities[row])[:3]
+        season = SEASONS[season_index]
+        results.append({
+            "season": season,
+            "dominant_trait": AXES[int(np.argmax(axis_match))],
+            "reasoning": f"A {_describe(features[row])} profile most closely matches {season}.",
+            "confidence": round(float(probabilities[row, season_index]), 3),
+            "alternatives": [
+                {"season": SEASONS[i], "probability": round(float(probabilities[row, i]), 3)}
+                for i in top[1:]
+            ],
+            "features": {axis: round(float(v), 3) for axis, v in zip(AXES, features[row])},
+            "source": "local"
+        })
+    return results
+
+
+def classify_season(traits, contrasts=None):
+    """Rule/score-based 12-season result for {skin, eyes, hair} analysis dicts.
+
+    Returns season, dominant_trait and reasoning (the LLM's output fields) plus
+    confidence in [0, 1], the next-best alternatives and the axis features.
+    """
+    return classify_seasons([traits], contrasts)[0]
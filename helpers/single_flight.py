@@ -0,0 +1,59 @@
+# helpers/single_flight.py
+#
+# Request coalescing: concurrent calls with the same key share one in-flight
+# computation instead of each starting their own. Per event loop, so each
+# worker process coalesces its own requests.
+
+import asyncio
+
+# name -> SingleFlight, for the debug endpoint
+FLIGHTS = {}
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time; later callers await it."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._waiters = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_waiters = 0
+        FLIGHTS[name] = self
+
+    async def do(self, key, compute):
+        """Result of compute() (a coroutine function), shared with concurrent same-key callers."""
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(compute())
+            self._calls[key] = task
+            self._waiters[key] = 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+            self._waiters[key] += 1
+            self.max_waiters = max(self.max_waiters, self._waiters[key])
+        # Shielded so one caller disconnecting doesn't cancel the others' result
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            del self._waiters[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self):
+        calls = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "calls": calls,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "max_waiters": self.max_waiters,
+            "coalesce_rate": round(self.coalesced / calls, 4) if calls else 0.0
+        }
@@ -0,0 +1,221 @@
+# helpers/spatial_index.py
+
+import numpy as np
+
+# Below this many points a single vectorized scan beats walking a tree
+# (see scripts/bench_spatial_index.py for the crossover measurement).
+BRUTE_FORCE_MAX_POINTS = 4096
+
+DEFAULT_LEAF_SIZE = 32
+
+# Large query batches against moderately sized point sets are answered with
+# one matrix-product scan instead of walking the tree once per query
+BATCH_SCAN_MIN_QUERIES = 64
+BATCH_SCAN_MAX_POINTS = 8192
+
+# Bound on the temporary (queries x points) distance matrix in a batch scan
+_CHUNK_CELLS = 1 << 22
+
+
+def _as_queries(points, dims):
+    queries = np.asarray(points, dtype=np.float64)
+    if queries.ndim == 1:
+        queries = queries.reshape(1, dims)
+    return queries
+
+
+class BruteForceIndex:
+    """Exact nearest neighbours by scanning every point; fastest for small sets."""
+
+    def __init__(self, points):
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self._norms = np.einsum('ij,ij->i', self.points, self.points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, points, k=1):
+        """Return (distances, indices), each shaped (M, k), sorted nearest first."""
+        queries = _as_queries(points, self.points.shape[1])
+        n = len(self.points)
+        k = min(k, n)
+        out_d = np.empty((len(queries), k))
+        out_i = np.empty((len(queries), k), dtype=np.intp)
+
+        step = max(1, _CHUNK_CELLS // max(n, 1))
+        for lo in range(0, len(queries), step):
+            chunk = queries[lo:lo + step]
+            # |q|² - 2 q·p + |p|² as one matrix product; exact for integer RGB
+            dist_sq = np.einsum('ij,ij->i', chunk, chunk)[:, None] - 2 * chunk @ self.points.T + self._norms
+            np.maximum(dist_sq, 0, out=dist_sq)
+
+            if k == 1:
+                idx = np.argmin(dist_sq, axis=1)[:, None]
+            elif k < n:
+                idx = np.argpartition(dist_sq, k - 1, axis=1)[:, :k]
+                # argpartition picks arbitrarily among points tied with the
+                # k-th distance; redo those rows so the lower index wins
+                kth = np.take_along_axis(dist_sq, idx, axis=1).max(axis=1)
+                ties = np.count_nonzero(dist_sq <= kth[:, None], axis=1) > k
+                for row in np.flatnonzero(ties):
+                    candidates = np.flatnonzero(dist_sq[row] <= kth[row])
+                    idx[row] = candidates[np.lexsort((candidates, dist_sq[row, candidates]))[:k]]
+            else:
+                idx = np.broadcast_to(np.arange(n), dist_sq.shape).copy()
+
+            if k > 1:
+                part = np.take_along_axis(dist_sq, idx, axis=1)
+                # Sort the k survivors by distance, then by palette position
+                order = np.lexsort((idx, part), axis=1)
+                idx = np.take_along_axis(idx, order, axis=1)
+
+            out_i[lo:lo + step] = idx
+            out_d[lo:lo + step] = np.sqrt(np.take_along_axis(dist_sq, idx, axis=1))
+
+        return out_d, out_i
+
+    def query_radius(self, point, radius):
+        """Return the indices (ascending) of all points within radius of one point."""
+        diff = self.points - np.asarray(point, dtype=np.float64).reshape(-1)
+        dist_sq = np.einsum('ij,ij->i', diff, diff)
+        return np.flatnonzero(dist_sq <= radius * radius)
+
+
+class KDTreeIndex:
+    """Exact k-nearest-neighbour KD-tree with vectorized leaf buckets.
+
+    Ties are broken by the lower original index, matching BruteForceIndex.
+    """
+
+    def __init__(self, points, leaf_size=DEFAULT_LEAF_SIZE):
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self.leaf_size = max(1, leaf_size)
+
+        # Flat node storage; plain lists keep per-node access cheap in the query loop
+        self._dim = []
+        self._split = []
+        self._left = []
+        self._right = []
+        self._start = []
+        self._end = []
+
+        self.order = np.arange(len(self.points), dtype=np.intp)
+        if len(self.points):
+            self._build(0, len(self.points))
+        self.tree_points = np.ascontiguousarray(self.points[self.order])
+        self._scan = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def _new_node(self, start, end):
+        self._dim.append(-1)
+        self._split.append(0.0)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._start.append(start)
+        self._end.append(end)
+        return len(self._dim) - 1
+
+    def _build(self, start, end):
+        node = self._new_node(start, end)
+        if end - start <= self.leaf_size:
+            return node
+
+        segment = self.order[start:end]
+        coords = self.points[segment]
+        dim = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+        sort = np.argsort(coords[:, dim], kind='stable')
+        self.order[start:end] = segment[sort]
+
+        mid = (start + end) // 2
+        self._dim[node] = dim
+        self._split[node] = float(self.points[self.order[mid], dim])
+        self._left[node] = self._build(start, mid)
+        self._right[node] = self._build(mid, end)
+        return node
+
+    def _query_one(self, q, k):
+        n = len(self.points)
+        best_d = np.full(k, np.inf)
+        best_i = np.full(k, n, dtype=np.intp)
+        worst = np.inf
+
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound > worst:
+                continue
+
+            dim = self._dim[node]
+            if dim < 0:
+                start, end = self._start[node], self._end[node]
+                diff = self.tree_points[start:end] - q
+                dist_sq = np.einsum('ij,ij->i', diff, diff)
+                all_d = np.concatenate((best_d, dist_sq))
+                all_i = np.concatenate((best_i, self.order[start:end]))
+                keep = np.lexsort((all_i, all_d))[:k]
+                best_d = all_d[keep]
+                best_i = all_i[keep]
+                worst = best_d[-1]
+                continue
+
+            delta = q[dim] - self._split[node]
+            if delta < 0:
+                near, far = self._left[node], self._right[node]
+            else:
+                near, far = self._right[node], self._left[node]
+            stack.append((far, max(bound, delta * delta)))
+            stack.append((near, bound))
+
+        return np.sqrt(best_d), best_i
+
+    def query(self, points, k=1):
+        """Return (distances, indices), each shaped (M, k), sorted nearest first."""
+        queries = _as_queries(points, self.points.shape[1])
+        if len(queries) >= BATCH_SCAN_MIN_QUERIES and len(self.points) <= BATCH_SCAN_MAX_POINTS:
+            if self._scan is None:
+                self._scan = BruteForceIndex(self.points)
+            return self._scan.query(queries, k)
+
+        k = min(k, len(self.points))
+        out_d = np.empty((len(queries), k))
+        out_i = np.empty((len(queries), k), dtype=np.intp)
+        for row, q in enumerate(queries):
+            out_d[row], out_i[row] = self._query_one(q, k)
+        return out_d, out_i
+
+    def query_radius(self, point, radius):
+        """Return the indices (ascending) of all points within radius of one point."""
+        q = np.asarray(point, dtype=np.float64).reshape(-1)
+        radius_sq = radius * radius
+        found = []
+
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound > radius_sq:
+                continue
+
+            dim = self._dim[node]
+            if dim < 0:
+                start, end = self._start[node], self._end[node]
+                diff = self.tree_points[start:end] - q
+                dist_sq = np.einsum('ij,ij->i', diff, diff)
+                found.append(self.order[start:end][dist_sq <= radius_sq])
+                continue
+
+            delta = q[dim] - self._split[node]
+            stack.append((self._left[node], max(bound, delta * delta) if delta > 0 else bound))
+            stack.append((self._right[node], max(bound, delta * delta) if delta < 0 else bound))
+
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(found))
+
+
+def build_index(points, leaf_size=DEFAULT_LEAF_SIZE, brute_force_max=BRUTE_FORCE_MAX_POINTS):
+    """Pick the cheaper exact index for a point set of this size."""
+    if len(points) <= brute_force_max:
+        return BruteForceIndex(points)
+    return KDTreeIndex(points, leaf_size=leaf_size)
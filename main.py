@@ -1,28 +1,71 @@
-from fastapi import FastAPI, HTTPException, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from helpers.season_analyzer import analyze_color_season
-import os
+from helpers.season_analyzer import (analyze_color_season, close_client, close_season_cache, preload_client_sdk,
+                                     stream_color_season)
+import asyncio
+import json
+import numpy as np
 from dotenv import load_dotenv
-from openai import OpenAI
-import colorsys
 from typing import Dict, Any
-from helpers.colora import nearest_color
-from helpers.color_analysis import analyze_color
+from helpers.colora import nearest_color, nearest_colors, parse_hex, rgb_to_hex
+from helpers.color_analysis import analysis_record, analyze_color, analyze_colors
+from helpers.image_colors import (REGION_MAX_SIDE, REPORT_MAX_SIDE, dominant_colors, load_image_rgb,
+                                  palette_proportions, region_mask, representative_color)
+from helpers.harmony import HARMONIES, harmony_candidates
+from helpers.lru_cache import CACHES
+from helpers.season_classifier import SEASONS, UnknownSeasonError, season_index
+from helpers.single_flight import FLIGHTS
+from helpers.palette import (DEFAULT_PALETTE, UnknownPaletteError, available_palettes, get_palette, json_bytes,
+                             palette_is_warm, warm_palette)
 from pathlib import Path
 
 # Load environment variables
 load_dotenv()
 
+
+async def ensure_palette(name):
+    """Load and warm a palette in the threadpool on its first request, so building
+    its tables never blocks the event loop. Raises UnknownPaletteError."""
+    if not palette_is_warm(name):
+        await run_in_threadpool(warm_palette, name)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the palette and its lookup structures and import the LLM SDK before
+    # taking traffic, off the event loop. A cold .cache/ builds the RGB lookup
+    # table in the background; scripts/build_artifacts.py prebuilds it.
+    await asyncio.gather(ensure_palette(DEFAULT_PALETTE), run_in_threadpool(preload_client_sdk))
+    yield
+    await close_client()
+    close_season_cache()
+
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Set up static files and templates
 app.mount("/static", StaticFiles(directory=Path(__file__).parent / "static"), name="static")
 templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
 
+# Upper bound on hex codes accepted by one /color/batch request
+MAX_BATCH_SIZE = 10000
+
+# Upper bound on the k nearest shades /color will return
+MAX_TOP_K = 50
+
+# Most partner shades one /color/partners response lists (count covers all)
+MAX_PARTNERS = 500
+
+# Largest accepted photo upload, and most dominant colors returned per photo
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+MAX_DOMINANT_COLORS = 12
+
 
 
 # -------------------------
@@ -44,7 +87,18 @@ class SeasonRequest(BaseModel):
 # -------------------------
 
 @app.post("/analyze-color-season")
-async def analyze_color_season_api(data: SeasonRequest):
+async def analyze_color_season_api(data: SeasonRequest, palette: str = DEFAULT_PALETTE, reasoning: bool = False,
+                                   recommend: int = Query(12, ge=0, le=MAX_TOP_K)):
+    """12-season analysis; the LLM is only asked when the local classifier is
+    unsure or reasoning=true requests its narrative explanation. The response
+    also lists the recommend palette shades that best suit the season."""
+    try:
+        await ensure_palette(palette)
+    except UnknownPaletteError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         # Convert Pydantic model → pure dict
         traits = {
@@ -53,17 +107,55 @@ async def analyze_color_season_api(data: SeasonRequest):
             "hair": data.hair.dict()
         }
 
-        # Call OpenAI-based analyzer
-        season_result = await analyze_color_season(traits)
+        # Local classifier first, OpenAI-based analyzer as the fallback
+        season_result = await analyze_color_season(traits, palette=palette, reasoning=reasoning)
 
         return {
             "status": "success",
             "traits_received": traits,
-            "season_analysis": season_result
+            "season_analysis": season_result,
+            "recommendations": season_recommendations(season_result, recommend, palette)
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/analyze-color-season/stream")
+async def analyze_color_season_stream(data: SeasonRequest, palette: str = DEFAULT_PALETTE, reasoning: bool = False,
+                                      recommend: int = Query(12, ge=0, le=MAX_TOP_K)):
+    """/analyze-color-season as Server-Sent Events: "traits" (local analysis,
+    contrast and classification) right away, "token" events while the LLM
+    writes, then "result" with the same body the plain endpoint returns."""
+    try:
+        await ensure_palette(palette)
+    except UnknownPaletteError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    traits = {
+        "skin": data.skin.dict(),
+        "eyes": data.eyes.dict(),
+        "hair": data.hair.dict()
+    }
+
+    async def events():
+        try:
+            async for event, payload in stream_color_season(traits, palette=palette, reasoning=reasoning):
+                if event == "result":
+                    payload = {
+                        "status": "success",
+                        "traits_received": traits,
+                        "season_analysis": payload,
+                        "recommendations": season_recommendations(payload, recommend, palette)
+                    }
+                yield sse_event(event, payload)
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
     
     
 @app.get("/", response_class=HTMLResponse)
@@ -71,12 +163,343 @@ async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.get("/color")
-async def get_color_details(hex_code: str):
-    closest = nearest_color(hex_code)
-    return closest
-    analysis = analyze_color(closest["closest_hex"])
+async def get_color_details(hex_code: str, metric: str = "rgb", k: int = Query(1, ge=1, le=MAX_TOP_K),
+                            palette: str = DEFAULT_PALETTE, analysis: bool = False):
+    try:
+        await ensure_palette(palette)
+        closest = nearest_color(hex_code, metric=metric, k=k, palette=palette)
+    except UnknownPaletteError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not analysis:
+        return closest
+
+    # Palette shades are analyzed once at load; splice in the cached JSON
+    table = get_palette(palette)
+    index = table.index_of_hex(closest["closest_hex"])
+    body = b'{"match":' + json_bytes(closest) + b',"analysis":' + table.analysis_json(index) + b'}'
+    return Response(content=body, media_type="application/json")
+
+
+def match_and_analyze_batch(hex_codes, metric="rgb", palette=DEFAULT_PALETTE):
+    """Resolve many hex codes at once into a serialized JSON response body.
+
+    Analyses come pre-serialized from the palette's analysis table, so each
+    result is one index lookup plus encoding its match dict.
+    """
+    matches = nearest_colors(hex_codes, metric=metric, palette=palette)
+    table = get_palette(palette)
+
+    items = []
+    errors = 0
+    for match in matches:
+        if "error" in match:
+            errors += 1
+            items.append(json_bytes(match))
+            continue
+        index = table.index_of_hex(match["closest_hex"])
+        items.append(b'{"match":' + json_bytes(match) + b',"analysis":' + table.analysis_json(index) + b'}')
+
+    return (b'{"count":' + str(len(matches)).encode() + b',"errors":' + str(errors).encode()
+            + b',"results":[' + b",".join(items) + b']}')
+
+
+def sse_event(event, data):
+    """One Server-Sent Events frame with a JSON data line."""
+    return b"event: " + event.encode() + b"\ndata: " + json_bytes(data) + b"\n\n"
+
+
+def season_recommendations(season_result, n, palette=DEFAULT_PALETTE):
+    """Best palette shades for the season in an analyze_color_season() result, if it has one."""
+    season = (season_result.get("season_analysis") or {}).get("season")
+    if not isinstance(season, str) or not n:
+        return []
+    try:
+        return season_palette(season, n, palette=palette)
+    except UnknownSeasonError:
+        return []
+
+
+def season_palette(season, n=20, chroma=None, palette=DEFAULT_PALETTE):
+    """The n palette shades that best suit a season, from the pre-sorted season index."""
+    table = get_palette(palette)
+    indices, scores = table.season_shades(season, n, chroma)
+    return [
+        {"name": table.name(index), "hex": table.hex(index), "score": round(score, 4)}
+        for index, score in zip(indices.tolist(), scores.tolist())
+    ]
+
+
+def color_partners(hex_code, min_contrast=None, max_contrast=None, min_delta_e=None, max_delta_e=None,
+                   sort="contrast", limit=50, palette=DEFAULT_PALETTE):
+    """Palette shades that pass contrast / ΔE thresholds against a color's closest shade."""
+    table = get_palette(palette)
+    index, _ = table.nearest(parse_hex(hex_code))
+    indices, delta_e, contrast = table.partners(index, min_contrast, max_contrast, min_delta_e, max_delta_e, sort)
 
     return {
-        "match": closest,
-        "analysis": analysis
-    }
\ No newline at end of file
+        "input_hex": hex_code,
+        "closest_name": table.name(index),
+        "closest_hex": table.hex(index),
+        "count": len(indices),
+        "partners": [
+            {"name": table.name(i), "hex": table.hex(i), "delta_e": round(d, 2), "contrast_ratio": round(c, 2)}
+            for i, d, c in zip(indices[:limit].tolist(), delta_e[:limit].tolist(), contrast[:limit].tolist())
+        ]
+    }
+
+
+def color_harmony(hex_code, metric="rgb", palette=DEFAULT_PALETTE):
+    """Harmony ramps for a color; the color and every candidate are snapped to
+    the palette in one batched query."""
+    rgb = parse_hex(hex_code)
+    table = get_palette(palette)
+    groups, candidates = harmony_candidates(rgb)
+    indices, distances = table.nearest_many(np.vstack(([rgb], candidates)), metric=metric)
+
+    def snapped(row, generated):
+        index = int(indices[row])
+        return {
+            "hex": rgb_to_hex(generated),
+            "closest_name": table.name(index),
+            "closest_hex": table.hex(index),
+            "distance": round(float(distances[row]), 4)
+        }
+
+    harmonies = {name: [] for name in HARMONIES}
+    for row, (group, generated) in enumerate(zip(groups, candidates), start=1):
+        harmonies[group].append(snapped(row, generated))
+
+    return {"input_hex": hex_code, "match": snapped(0, rgb), "harmonies": harmonies}
+
+
+def extract_image_colors(data, k=5, metric="rgb", palette=DEFAULT_PALETTE):
+    """Dominant colors of an uploaded photo, each matched to the palette and analyzed."""
+    pixels, (width, height) = load_image_rgb(data)
+    rgb, fractions = dominant_colors(pixels, k)
+    hexes = [rgb_to_hex(c) for c in rgb]
+    matches = nearest_colors(hexes, metric=metric, palette=palette)
+    columns = analyze_colors(rgb)
+
+    return {
+        "width": width,
+        "height": height,
+        "colors": [
+            {
+                "hex": hex_code,
+                "fraction": round(float(fraction), 4),
+                "match": match,
+                "analysis": analysis_record(columns, i, hex_code)
+            }
+            for i, (hex_code, fraction, match) in enumerate(zip(hexes, fractions, matches))
+        ]
+    }
+
+
+def sample_image_regions(data, regions, metric="rgb", palette=DEFAULT_PALETTE):
+    """One robust color per skin/eyes/hair region, shaped like a SeasonRequest body."""
+    pixels, (width, height) = load_image_rgb(data, max_side=REGION_MAX_SIDE)
+    scale = pixels.shape[1] / width
+
+    traits = {}
+    stats = {}
+    for trait in ("skin", "eyes", "hair"):
+        region = regions.get(trait)
+        if not isinstance(region, dict):
+            raise ValueError(f"Missing region for {trait}")
+        selected = pixels[region_mask(pixels.shape, region, scale)]
+        if len(selected) == 0:
+            raise ValueError(f"The {trait} region covers no pixels")
+
+        rgb, inliers = representative_color(selected)
+        hex_code = rgb_to_hex(rgb)
+        match = nearest_color(hex_code, metric=metric, palette=palette)
+        traits[trait] = {
+            "match": {"hex": hex_code, **match},
+            "analysis": {**match, **analyze_color(hex_code)}
+        }
+        stats[trait] = {"pixels": int(len(selected)), "inliers": int(inliers)}
+
+    return {"width": width, "height": height, "season_request": traits, "regions": stats}
+
+
+def image_palette_report(data, top=20, metric="rgb", palette=DEFAULT_PALETTE):
+    """How much of a photo each palette shade covers, via the histogram quantizer."""
+    pixels, (width, height) = load_image_rgb(data, max_side=REPORT_MAX_SIDE)
+    table = get_palette(palette)
+    indices, fractions = palette_proportions(pixels, table, metric=metric)
+
+    return {
+        "width": width,
+        "height": height,
+        "shades": len(indices),
+        "colors": [
+            {
+                "closest_name": table.name(index),
+                "closest_hex": table.hex(index),
+                "fraction": round(float(fraction), 4)
+            }
+            for index, fraction in zip(indices[:top].tolist(), fractions[:top])
+        ]
+    }
+
+
+async def read_upload(file: UploadFile):
+    data = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image larger than {MAX_UPLOAD_BYTES} bytes")
+    return data
+
+
+@app.post("/image/colors")
+async def get_image_colors(file: UploadFile = File(...), k: int = Query(5, ge=1, le=MAX_DOMINANT_COLORS),
+                           metric: str = "rgb", palette: str = DEFAULT_PALETTE):
+    """Extract a photo's dominant colors (k-means on a downsampled copy)."""
+    data = await read_upload(file)
+    try:
+        return await run_in_threadpool(extract_image_colors, data, k, metric, palette)
+    except UnknownPaletteError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/image/palette-report")
+async def get_image_palette_report(file: UploadFile = File(...), top: int = Query(20, ge=1, le=MAX_TOP_K),
+                                   metric: str = "rgb", palette: str = DEFAULT_PALETTE):
+    """Color-proportion report of a photo over the palette's shades."""
+    data = await read_upload(file)
+    try:
+        return await run_in_threadpool(image_palette_report, data, top, metric, palette)
+    except UnknownPaletteError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/image/regions")
+async def get_image_regions(file: UploadFile = File(...), regions: str = Form(...),
+                            metric: str = "rgb", palette: str = DEFAULT_PALETTE):
+    """Sample skin, eyes and hair from user-selected regions of a photo.
+
+    regions is a JSON object with "skin", "eyes" and "hair", each either
+    {"rect": [x, y, width, height]} or {"polygon": [[x, y], ...]} in original
+    image pixels. The "season_request" in the response can be posted as-is to
+    /analyze-color-season.
+    """
+    try:
+        regions = json.loads(regions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regions JSON: {e}")
+    if not isinstance(regions, dict):
+        raise HTTPException(status_code=400, detail="regions must be a JSON object")
+
+    data = await read_upload(file)
+    try:
+        return await run_in_threadpool(sample_image_regions, data, regions, metric, palette)
+    except UnknownPaletteError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/color/partners")
+async def get_color_partners(hex_code: str, min_contrast: float = None, max_contrast: float = None,
+                             min_delta_e: float = None, max_delta_e: float = None, sort: str = "contrast",
+                             limit: int = Query(50, ge=1, le=MAX_PARTNERS), palette: str = DEFAULT_PALETTE):
+    """Palette shades legible (WCAG contrast ratio) or harmonious (ΔE2000) next to
+    a color. Thresholds use exact values; the palette's precomputed ΔE matrix
+    narrows the candidates."""
+    try:
+        # Off the event loop: the first query builds the palette's pair matrix
+        return await run_in_threadpool(color_partners, hex_code, min_contrast, max_contrast, min_delta_e,
+                                       max_delta_e, sort, limit, palette)
+    except UnknownPaletteError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/harmony")
+async def get_color_harmony(hex: str, metric: str = "rgb", palette: str = DEFAULT_PALETTE):
+    """Complementary, analogous, triadic, split-complementary and tint/shade
+    ramps for a color, each snapped to the nearest palette shade."""
+    try:
+        await ensure_palette(palette)
+        return color_harmony(hex, metric=metric, palette=palette)
+    except UnknownPaletteError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/season/{name}/palette")
+async def get_season_palette(name: str, n: int = Query(20, ge=1, le=MAX_TOP_K), chroma: str = None,
+                             palette: str = DEFAULT_PALETTE):
+    """Palette shades ranked by fit for a season ("Soft Autumn" or "soft-autumn"),
+    optionally only those with a chroma label (Bright / Soft / Muted)."""
+    try:
+        await ensure_palette(palette)
+        colors = season_palette(name, n, chroma, palette)
+    except (UnknownPaletteError, UnknownSeasonError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"season": SEASONS[season_index(name)], "chroma": chroma, "colors": colors}
+
+
+@app.get("/palettes")
+async def list_palettes():
+    return {"default": DEFAULT_PALETTE, "palettes": available_palettes()}
+
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+@app.get("/debug/cache")
+async def get_cache_stats():
+    # In the threadpool: the season result store counts its SQLite rows
+    return await run_in_threadpool(cache_stats)
+
+
+@app.get("/debug/coalescing")
+async def get_coalescing_stats():
+    return {name: flight.stats() for name, flight in FLIGHTS.items()}
+
+
+@app.post("/color/batch")
+async def get_color_details_batch(request: Request, metric: str = "rgb", palette: str = DEFAULT_PALETTE):
+    """Match many hex codes in one call.
+
+    Body is either a JSON array of hex strings (or {"hex_codes": [...]}) or
+    newline-delimited text. Results keep input order; invalid items carry an
+    "error" field instead of failing the batch.
+    """
+    body = await request.body()
+
+    if "json" in request.headers.get("content-type", ""):
+        try:
+            payload = json.loads(body or b"[]")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        if isinstance(payload, dict):
+            payload = payload.get("hex_codes")
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of hex codes")
+        hex_codes = payload
+    else:
+        hex_codes = [line.strip() for line in body.decode("utf-8", "replace").splitlines() if line.strip()]
+
+    if len(hex_codes) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(hex_codes)} > {MAX_BATCH_SIZE}")
+
+    try:
+        body = await run_in_threadpool(match_and_analyze_batch, hex_codes, metric, palette)
+    except UnknownPaletteError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,45 @@
+# scripts/bench_spatial_index.py
+#
+# Compare brute-force and KD-tree nearest-neighbour queries over palettes of
+# growing size to find where the tree starts to win.
+#
+#   python -m scripts.bench_spatial_index [queries]
+
+import sys
+import time
+
+import numpy as np
+
+from helpers.spatial_index import BruteForceIndex, KDTreeIndex
+
+PALETTE_SIZES = [256, 1024, 1790, 4096, 16384, 65536, 179000]
+
+
+def time_queries(index, queries):
+    start = time.perf_counter()
+    for q in queries:
+        index.query(q)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main(num_queries=500):
+    rng = np.random.default_rng(0)
+    queries = rng.integers(0, 256, size=(num_queries, 3))
+
+    print(f"{'palette':>8} {'brute us/q':>11} {'kdtree us/q':>12} {'build ms':>9}  winner")
+    for size in PALETTE_SIZES:
+        points = rng.integers(0, 256, size=(size, 3))
+
+        brute = BruteForceIndex(points)
+        start = time.perf_counter()
+        tree = KDTreeIndex(points)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        brute_us = time_queries(brute, queries)
+        tree_us = time_queries(tree, queries)
+        winner = "kdtree" if tree_us < brute_us else "brute"
+        print(f"{size:>8} {brute_us:>11.1f} {tree_us:>12.1f} {build_ms:>9.1f}  {winner}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,42 @@
+# scripts/build_artifacts.py
+#
+# Prebuild every on-disk artifact the app would otherwise build on first use:
+# the compiled palette arrays, the RGB lookup table (32-64 MB per palette) and
+# the N x N ΔE pair matrix (palettes up to COLOR_PAIR_MATRIX_MAX colors). Run
+# once per deploy so a cold .cache/ doesn't cost seconds at startup or on the
+# first partner query.
+#
+#   python -m scripts.build_artifacts [palette ...]
+#
+# With no arguments every registered palette is built. Honors COLOR_LUT_DIR
+# and COLOR_ARTIFACT_DIR like the app.
+
+import sys
+import time
+
+from helpers.pair_matrix import PAIR_MATRIX_MAX_ENTRIES, load_pair_matrix, pair_path
+from helpers.palette import available_palettes, get_palette
+from helpers.rgb_lut import load_lut, lut_path
+
+
+def build(name):
+    start = time.perf_counter()
+    palette = get_palette(name)
+    load_lut(palette.rgb, name)
+    print(f"  RGB lookup table: {lut_path(palette.rgb, name)}")
+    if len(palette) <= PAIR_MATRIX_MAX_ENTRIES:
+        load_pair_matrix(palette.rgb, palette.lab, name)
+        print(f"  pair matrix:      {pair_path(palette.rgb, name)}")
+    else:
+        print(f"  pair matrix:      skipped, above {PAIR_MATRIX_MAX_ENTRIES} colors")
+    print(f"✅ {name} ({len(palette)} colors) in {time.perf_counter() - start:.1f} s")
+
+
+def main(names):
+    for name in names or list(available_palettes()):
+        build(name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,103 @@
+# scripts/check_import_time.py
+#
+# Import-time budget for the app module. Runs `python -X importtime -c
+# "import main"` in a fresh interpreter and fails (exit 1) when the cumulative
+# import time exceeds the budget or when a module that should load lazily is
+# pulled in at import time. Then times import plus the lifespan startup
+# hook against an empty (cold) .cache/, which is what a fresh deploy that
+# skipped scripts/build_artifacts.py pays before taking traffic.
+#
+#   python -m scripts.check_import_time [budget_ms]
+#
+# IMPORT_TIME_BUDGET_MS and STARTUP_TIME_BUDGET_MS override the default budgets.
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", "900"))
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_TIME_BUDGET_MS", "2000"))
+
+# Heavy modules that must only load on first use
+LAZY_MODULES = ("openai", "helpers.color_db")
+
+RUNS = 3
+
+# Imports main and runs its lifespan startup; prints the elapsed milliseconds
+_STARTUP = """
+import asyncio, time
+start = time.perf_counter()
+import main
+async def startup():
+    async with main.lifespan(main.app):
+        print((time.perf_counter() - start) * 1000)
+asyncio.run(startup())
+"""
+
+
+def measure():
+    """Return ({module: cumulative_us}, total_us) for one cold `import main`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import main failed:\n{proc.stderr}")
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if cum.strip().isdigit():
+            cumulative[name.strip()] = int(cum)
+    return cumulative, cumulative.get("main", 0)
+
+
+def measure_cold_startup():
+    """Milliseconds from interpreter start of `import main` to serving, with empty caches."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, COLOR_LUT_DIR=cache_dir, COLOR_ARTIFACT_DIR=cache_dir,
+                   SEASON_CACHE_PATH=os.path.join(cache_dir, "season_results.sqlite3"))
+        proc = subprocess.run([sys.executable, "-c", _STARTUP], cwd=ROOT, env=env,
+                              capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"lifespan startup failed:\n{proc.stderr}")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main(budget_ms=DEFAULT_BUDGET_MS):
+    # Best of a few runs, to keep filesystem-cache noise out of the verdict
+    runs = [measure() for _ in range(RUNS)]
+    cumulative, total_us = min(runs, key=lambda r: r[1])
+    total_ms = total_us / 1000
+
+    top = sorted(((us, name) for name, us in cumulative.items() if name.count(".") == 0),
+                 reverse=True)[:8]
+    print(f"import main: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    for us, name in top:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.0f} ms exceeds budget {budget_ms:.0f} ms")
+    for name in LAZY_MODULES:
+        if name in cumulative:
+            failures.append(f"{name} is imported at startup; it should load lazily")
+
+    startup_ms = min(measure_cold_startup() for _ in range(RUNS))
+    print(f"import + lifespan, cold cache: {startup_ms:.0f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)")
+    if startup_ms > STARTUP_BUDGET_MS:
+        failures.append(f"cold startup {startup_ms:.0f} ms exceeds budget {STARTUP_BUDGET_MS:.0f} ms")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS))
@@ -0,0 +1,73 @@
+# scripts/check_season_archetypes.py
+#
+# Regression check for the local season classifier. Textbook profiles must
+# land in their season family, and a grid of deep complexions must never be
+# called a light or muted season confidently enough to skip the LLM (very dark
+# features used to read as "muted" and come out Soft Summer at ~0.8).
+#
+#   python -m scripts.check_season_archetypes
+#
+# Exits 1 on any failure.
+
+import itertools
+import sys
+
+from helpers.color_analysis import analyze_color
+from helpers.season_classifier import CONFIDENCE_THRESHOLD, classify_season
+
+# (label, skin, eyes, hair, acceptable seasons)
+ARCHETYPES = (
+    ("deep cool", "#6B4A45", "#2A1A14", "#0C0C0C", {"Dark Winter", "Cool Winter"}),
+    ("deep cool, dark brown eyes", "#5A3C3A", "#3B2620", "#111111", {"Dark Winter", "Cool Winter"}),
+    ("deep warm", "#8D5A3B", "#3B2314", "#2B1A10", {"Dark Autumn", "Warm Autumn"}),
+    ("bright winter", "#E8C4B8", "#1F5FBF", "#111111", {"Bright Winter", "Cool Winter"}),
+    ("light warm", "#F3D3B5", "#8DB6A8", "#D8B46A", {"Light Spring", "Warm Spring"}),
+    ("light cool", "#F2D6D0", "#8FA8C8", "#C9B79C", {"Light Summer", "Cool Summer"}),
+    ("soft cool", "#D9B8AC", "#7C8794", "#7A6A5E", {"Soft Summer", "Cool Summer"}),
+    ("warm spring", "#F1C9A5", "#3FA07A", "#E0A040", {"Warm Spring", "Light Spring", "Bright Spring"}),
+    ("warm autumn", "#D6A77A", "#6E5A2A", "#5C3A21", {"Warm Autumn", "Soft Autumn", "Dark Autumn"}),
+    ("warm autumn, olive eyes", "#C99A6E", "#5E4B2B", "#6B4226", {"Warm Autumn", "Soft Autumn", "Dark Autumn"}),
+)
+
+# Deep complexions x dark eyes x dark hair
+DEEP_SKIN = ("#6B4A45", "#5A3C3A", "#4A302B", "#7A5548", "#3D2A26", "#5C4033", "#6F4E37", "#4B3621")
+DARK_EYES = ("#2A1A14", "#3B2620", "#1C1410", "#4A3020", "#2E2A26")
+DARK_HAIR = ("#0C0C0C", "#1A1110", "#2B1A10", "#111111")
+
+# Seasons a deep profile may not be given without asking the LLM
+NOT_DEEP = {"Light Spring", "Light Summer", "Soft Summer", "Cool Summer"}
+
+
+def profile(skin, eyes, hair):
+    return {trait: analyze_color(hex_code) for trait, hex_code in (("skin", skin), ("eyes", eyes), ("hair", hair))}
+
+
+def main():
+    failures = []
+    for label, skin, eyes, hair, expected in ARCHETYPES:
+        result = classify_season(profile(skin, eyes, hair))
+        ok = result["season"] in expected
+        print(f"{'✅' if ok else '❌'} {label:28s} {result['season']:14s} {result['confidence']:.3f}")
+        if not ok:
+            failures.append(label)
+
+    confident_wrong = 0
+    grid = list(itertools.product(DEEP_SKIN, DARK_EYES, DARK_HAIR))
+    for skin, eyes, hair in grid:
+        result = classify_season(profile(skin, eyes, hair))
+        if result["season"] in NOT_DEEP and result["confidence"] >= CONFIDENCE_THRESHOLD:
+            confident_wrong += 1
+            print(f"❌ deep {skin} {eyes} {hair}: {result['season']} at {result['confidence']:.3f}")
+    print(f"deep grid: {confident_wrong} of {len(grid)} confidently light or muted")
+    if confident_wrong:
+        failures.append("deep grid")
+
+    if failures:
+        print("FAIL")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
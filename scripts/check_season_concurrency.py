@@ -0,0 +1,137 @@
+# scripts/check_season_concurrency.py
+#
+# Event-loop responsiveness while LLM calls are outstanding. Starts a local
+# stub of the chat-completions API that answers after STUB_DELAY seconds,
+# fires many /analyze-color-season?reasoning=true requests at the app (all
+# reach the stub), and measures /color latency while they are in flight.
+# Fails (exit 1) when /color p95 rises above the budget, which is what a
+# blocking LLM client does to every other request on the worker.
+#
+#   python -m scripts.check_season_concurrency [season_requests]
+#
+# COLOR_P95_BUDGET_MS overrides the default budget.
+
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_DELAY = 1.0
+DEFAULT_SEASON_REQUESTS = 40
+COLOR_PROBES = 50
+COLOR_P95_BUDGET_MS = float(os.environ.get("COLOR_P95_BUDGET_MS", "50"))
+
+
+def season_body(i):
+    """A distinct profile per request, so neither the result cache nor
+    request coalescing can answer it without the (stub) LLM."""
+    skin = f"#{60 + i % 20 * 9:02X}{208 - i // 20 % 20 * 9:02X}B9"
+    return {
+        trait: {"match": {"hex": hex_code}, "analysis": {}}
+        for trait, hex_code in (("skin", skin), ("eyes", "#5C6E91"), ("hair", "#4A3A2F"))
+    }
+
+
+class StubCompletions(BaseHTTPRequestHandler):
+    """Minimal OpenAI chat-completions endpoint with a fixed delay."""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+        time.sleep(STUB_DELAY)
+        result = {"season": "Warm Spring", "dominant_trait": "undertone", "reasoning": "stub"}
+        prompt = request["messages"][-1]["content"]
+        if "Here are the profiles" in prompt:
+            # Batched prompt: one result per profile id
+            ids = re.findall(r'"id": (\d+),\s*"skin"', prompt)
+            content = json.dumps({"results": [{"id": int(i), **result} for i in ids]})
+        else:
+            content = json.dumps(result)
+        body = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def p95(samples):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+
+async def probe_color(client, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get("/color", params={"hex_code": "#3A7BD5"})
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def run(season_requests):
+    import httpx
+    import main
+
+    main.get_palette().warm()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60) as client:
+        idle = await probe_color(client, COLOR_PROBES)
+
+        start = time.perf_counter()
+        seasons = [asyncio.create_task(client.post("/analyze-color-season", params={"reasoning": "true"},
+                                                   json=season_body(i)))
+                   for i in range(season_requests)]
+        await asyncio.sleep(0.05)
+        busy = await probe_color(client, COLOR_PROBES)
+        responses = await asyncio.gather(*seasons)
+        elapsed = time.perf_counter() - start
+
+    await main.close_client()
+    main.close_season_cache()
+    answered = sum(r.json()["season_analysis"].get("status") == "success" for r in responses)
+    return idle, busy, answered, elapsed
+
+
+def main():
+    season_requests = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SEASON_REQUESTS
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCompletions)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Fresh result cache, so earlier runs can't answer for the stub
+        os.environ["SEASON_CACHE_PATH"] = os.path.join(cache_dir, "season_results.sqlite3")
+        try:
+            idle, busy, answered, elapsed = asyncio.run(run(season_requests))
+        finally:
+            server.shutdown()
+
+    print(f"season requests: {season_requests} ({answered} answered by the stub in {elapsed:.2f} s, "
+          f"stub delay {STUB_DELAY:.1f} s)")
+    print(f"/color p95 idle: {p95(idle):.2f} ms, with season calls in flight: {p95(busy):.2f} ms "
+          f"(budget {COLOR_P95_BUDGET_MS:.0f} ms)")
+
+    if answered != season_requests or p95(busy) > COLOR_P95_BUDGET_MS:
+        print("FAIL")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
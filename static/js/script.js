@@ -98,11 +98,14 @@ document.addEventListener('DOMContentLoaded', () => {
             requestData.hair.analysis = hairAnalysis;
             requestData.eyes.analysis = eyeAnalysis;
 
-            // Send to season analysis endpoint
-            const response = await fetch('/analyze-color-season', {
+            resultsSection.scrollIntoView({ behavior: 'smooth' });
+
+            // Stream the season analysis: local result first, then the LLM's text
+            const response = await fetch('/analyze-color-season/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream'
                 },
                 body: JSON.stringify(requestData)
             });
@@ -111,8 +114,27 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const result = await response.json();
-            displayResults(result);
+            if (!response.body) {
+                // No streaming support: the final event arrives with the rest
+                handleSeasonEvents(await response.text());
+                return;
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                // Handle every complete event; keep a trailing partial one
+                const end = buffer.lastIndexOf('\n\n');
+                if (end !== -1) {
+                    handleSeasonEvents(buffer.slice(0, end));
+                    buffer = buffer.slice(end + 2);
+                }
+            }
+            handleSeasonEvents(buffer);
             
         } catch (error) {
             console.error('Error:', error);
@@ -122,6 +144,42 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Text the LLM has streamed so far for the current analysis
+    let streamedText = '';
+
+    // Parse Server-Sent Events frames and update the display for each
+    function handleSeasonEvents(text) {
+        for (const frame of text.split('\n\n')) {
+            let event = 'message';
+            let data = '';
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            }
+            if (!data) continue;
+            handleSeasonEvent(event, JSON.parse(data));
+        }
+    }
+
+    function handleSeasonEvent(event, data) {
+        if (event === 'traits') {
+            // Local classification: show it right away as a preliminary result
+            streamedText = '';
+            updateSeasonDisplay(data.local);
+        } else if (event === 'token') {
+            streamedText += data.text;
+            // Show the reasoning as the model writes it
+            const partial = streamedText.match(/"reasoning"\s*:\s*"((?:[^"\\]|\\.)*)/);
+            if (partial) {
+                reasoning.textContent = partial[1].replace(/\\"/g, '"') + '…';
+            }
+        } else if (event === 'result') {
+            displayResults(data.season_analysis || data);
+        } else if (event === 'error') {
+            showError('Analysis Error', data.detail || 'An unknown error occurred');
+        }
+    }
+
     // Analyze a single color
     async function analyzeColor(hex) {
         try {
@@ -205,8 +263,4 @@ document.addEventListener('DOMContentLoaded', () => {
         seasonBadge.textContent = '!';
         seasonBadge.className = 'season-badge error';
     }
-
-        // Scroll to results
-        resultsSection.scrollIntoView({ behavior: 'smooth' });
-    }
 });